@@ -0,0 +1,177 @@
+import csv
+import io
+import json
+from datetime import datetime
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask_login import login_required
+from sqlalchemy import select
+from data import db_session
+from data.feed import filter_jobs, parse_feed_filters
+from data.permissions import current_permissions
+from data.models import User, Jobs, Department, Category
+
+# Версионированный JSON API: /api/v1/<ресурс>
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+# Ресурс -> (модель, поля, доступные через API). Хеш пароля не отдается никогда
+RESOURCES = {
+    'users': (User, ('id', 'surname', 'name', 'age', 'position', 'speciality', 'address', 'email',
+                     'modified_date')),
+    'jobs': (Jobs, ('id', 'team_leader', 'job', 'work_size', 'collaborators', 'start_date', 'end_date',
+                    'is_finished', 'modified_date')),
+    'departments': (Department, ('id', 'title', 'chief', 'members', 'email', 'modified_date')),
+    'categories': (Category, ('id', 'name', 'description')),
+}
+# Ресурсы с личными данными (почта, адрес, возраст) - только с отдельным правом
+RESOURCE_PERMISSIONS = {
+    'users': 'users.read',
+}
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+
+
+def api_error(message, status):
+    response = jsonify({'error': message})
+    response.status_code = status
+    return response
+
+
+def resource_error(resource):
+    """Ошибка доступа к ресурсу (404 или 403) либо None, если ресурс можно читать"""
+    if resource not in RESOURCES:
+        return api_error('Ресурс не найден', 404)
+    permission = RESOURCE_PERMISSIONS.get(resource)
+    if permission and not current_permissions().has(permission):
+        return api_error('Недостаточно прав', 403)
+    return None
+
+
+def selected_fields(allowed):
+    """Поля из параметра ?fields=a,b (по умолчанию все доступные); id всегда включается"""
+    requested = request.args.get('fields')
+    if not requested:
+        return allowed
+    fields = [field.strip() for field in requested.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Неизвестные поля: {', '.join(unknown)}")
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return tuple(fields)
+
+
+def serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def resource_select(resource):
+    """SELECT только выбранных колонок ресурса с фильтрами из строки запроса"""
+    model, allowed = RESOURCES[resource]
+    fields = selected_fields(allowed)
+    statement = select(*[getattr(model, field) for field in fields])
+    if model is Jobs:
+        statement = filter_jobs(statement, **parse_feed_filters(request.args))
+    return model, fields, statement
+
+
+@api_v1.route('/<resource>')
+@login_required
+def list_resource(resource):
+    """Страница записей с keyset-пагинацией: ?after=<id>&limit=<n>&fields=..."""
+    error = resource_error(resource)
+    if error:
+        return error
+    try:
+        model, fields, statement = resource_select(resource)
+    except ValueError as error:
+        return api_error(str(error), 400)
+
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    after = request.args.get('after', 0, type=int)
+    statement = statement.filter(model.id > after).order_by(model.id).limit(limit + 1)
+
+    rows = db_session.get_session().execute(statement).all()
+    next_after = rows[limit - 1].id if len(rows) > limit else None
+    items = [{field: serialize(value) for field, value in zip(fields, row)} for row in rows[:limit]]
+    return jsonify({'items': items, 'next_after': next_after})
+
+
+@api_v1.route('/<resource>/<int:id>')
+@login_required
+def get_resource(resource, id):
+    error = resource_error(resource)
+    if error:
+        return error
+    try:
+        model, fields, statement = resource_select(resource)
+    except ValueError as error:
+        return api_error(str(error), 400)
+
+    row = db_session.get_session().execute(statement.filter(model.id == id)).first()
+    if row is None:
+        return api_error('Запись не найдена', 404)
+    return jsonify({field: serialize(value) for field, value in zip(fields, row)})
+
+
+def stream_rows(statement):
+    """
+    Построчно читает результат через серверный курсор пачками по
+    EXPORT_BATCH_SIZE, не материализуя всю выборку в памяти
+    """
+    with db_session.get_engine().connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=EXPORT_BATCH_SIZE
+        ).execute(statement)
+        for partition in result.partitions():
+            yield partition
+
+
+def ndjson_lines(fields, statement):
+    for partition in stream_rows(statement):
+        yield "".join(
+            json.dumps({field: serialize(value) for field, value in zip(fields, row)}, ensure_ascii=False) + "\n"
+            for row in partition
+        )
+
+
+def csv_lines(fields, statement):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for partition in stream_rows(statement):
+        writer.writerows([serialize(value) for value in row] for row in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+@api_v1.route('/<resource>/export')
+@login_required
+def export_resource(resource):
+    """Потоковая выгрузка всего ресурса: ?format=ndjson|csv&fields=..."""
+    error = resource_error(resource)
+    if error:
+        return error
+    try:
+        model, fields, statement = resource_select(resource)
+    except ValueError as error:
+        return api_error(str(error), 400)
+    statement = statement.order_by(model.id)
+
+    export_format = request.args.get('format', 'ndjson')
+    if export_format == 'ndjson':
+        body, mimetype = ndjson_lines(fields, statement), 'application/x-ndjson'
+    elif export_format == 'csv':
+        body, mimetype = csv_lines(fields, statement), 'text/csv'
+    else:
+        return api_error('Поддерживаются форматы ndjson и csv', 400)
+
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={resource}.{export_format}'
+    return response
@@ -0,0 +1,66 @@
+"""
+Бенчмарк задач mars_queries.py на больших данных
+Использование:
+    python benchmarks/bench_mars_queries.py [<пользователей>] [<работ>]
+
+Во временной базе создаются колонисты, работы, департаменты и связи
+(по умолчанию 100 000 пользователей и 1 000 000 работ), после чего каждая
+задача выполняется с подавленным выводом. Для каждой задачи выводится
+время выполнения и число SQL-запросов.
+"""
+
+import sys
+import os
+import builtins
+import contextlib
+import shutil
+import tempfile
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import event
+from data import db_session
+from data.seed import generate_colony
+import mars_queries
+
+
+def main():
+    users_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    jobs_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+
+    tmp_dir = tempfile.mkdtemp()
+    db_file = os.path.join(tmp_dir, "bench.db")
+    try:
+        db_session.global_init(db_file, migrate=True)
+        session = db_session.create_session()
+
+        started = time.perf_counter()
+        generate_colony(session, users=users_count, jobs=jobs_count, departments=10, seed=42)
+        session.close()
+        print(f"Заполнение: {users_count} пользователей, {jobs_count} работ за {time.perf_counter() - started:.1f} с\n")
+
+        statements = [0]
+        event.listen(db_session.get_engine(), "before_cursor_execute",
+                     lambda *args: statements.__setitem__(0, statements[0] + 1))
+
+        # Задача 7 запрашивает подтверждение - отвечаем автоматически
+        builtins.input = lambda prompt="": "y"
+
+        print(f"{'задача':<8}{'время, с':>12}{'запросов':>12}")
+        for number, (_, task_function) in mars_queries.TASKS.items():
+            session = db_session.create_session()
+            statements[0] = 0
+            started = time.perf_counter()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                task_function(session)
+            elapsed = time.perf_counter() - started
+            session.close()
+            print(f"{number:<8}{elapsed:>12.3f}{statements[0]:>12}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
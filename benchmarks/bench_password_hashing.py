@@ -0,0 +1,48 @@
+"""
+Микробенчмарк профилей хеширования паролей
+Использование:
+    python benchmarks/bench_password_hashing.py [<секунд_на_профиль>]
+
+Для каждого профиля из data/passwords.py измеряется, сколько проверок
+пароля (входов в систему) в секунду выдерживает одно ядро, и сколько
+стоит хеширование одного пароля при заполнении базы.
+"""
+
+import sys
+import os
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from werkzeug.security import check_password_hash
+from data.passwords import PASSWORD_PROFILES, hash_password
+
+PASSWORD = "colonist123"
+
+
+def measure(function, duration):
+    """Вызывает функцию, пока не истечет время, и возвращает число вызовов в секунду"""
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= duration:
+            return calls / elapsed
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+
+    print(f"{'профиль':<12}{'метод':<22}{'входов/с на ядро':>18}{'мс на хеш':>12}")
+    for profile, method in PASSWORD_PROFILES.items():
+        hashed = hash_password(PASSWORD, profile)
+        logins = measure(lambda: check_password_hash(hashed, PASSWORD), duration)
+        hashes = measure(lambda: hash_password(PASSWORD, profile), duration)
+        print(f"{profile:<12}{method:<22}{logins:>18.1f}{1000 / hashes:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Нагрузочный тест профилей SQLite: смешанные чтения и записи
+Использование:
+    python benchmarks/bench_sqlite_profile.py [<имя_бд>] [<процессов>] [<секунд>]
+
+Для каждого профиля (default - как было до настройки, production - WAL и PRAGMA)
+база копируется во временный файл и мигрируется (как migrate.py), после чего
+несколько процессов (как воркеры gunicorn) одновременно читают ленту работ
+и добавляют новые работы.
+Выводится пропускная способность и число ошибок "database is locked".
+"""
+
+import sys
+import os
+import random
+import shutil
+import tempfile
+import time
+from multiprocessing import Pool
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+WRITE_RATIO = 0.2
+
+
+def worker(args):
+    db_file, profile, duration, seed = args
+    from sqlalchemy.exc import OperationalError
+    from data import db_session
+    from data.feed import jobs_page
+    from data.models import Jobs
+
+    db_session.global_init(db_file, profile=profile)
+    rnd = random.Random(seed)
+    reads = writes = locked = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        db_sess = db_session.create_session()
+        try:
+            if rnd.random() < WRITE_RATIO:
+                db_sess.add(Jobs(team_leader=1, job="benchmark job",
+                                 work_size=rnd.randint(1, 40), is_finished=False))
+                db_sess.commit()
+                writes += 1
+            else:
+                jobs, _ = jobs_page(db_sess, limit=20)
+                for job in jobs:
+                    job.team_leader_user, job.categories
+                reads += 1
+        except OperationalError as error:
+            if not db_session.is_lock_error(error):
+                raise
+            locked += 1
+        finally:
+            db_sess.close()
+    return reads, writes, locked
+
+
+def migrate(db_file):
+    """
+    Приводит копию базы к текущей схеме (новые колонки, индексы, статистика).
+    Отдельный движок, а не db_session.global_init: инициализация выполняется
+    один раз на процесс и досталась бы воркерам пула после fork
+    """
+    from sqlalchemy import create_engine
+    from data import db_session, models
+    engine = create_engine(f'sqlite:///{db_file}')
+    try:
+        db_session.run_migrations(engine)
+    finally:
+        engine.dispose()
+
+
+def run_profile(source_db, profile, processes, duration):
+    tmp_dir = tempfile.mkdtemp()
+    db_file = os.path.join(tmp_dir, "bench.db")
+    shutil.copy(source_db, db_file)
+    migrate(db_file)
+    try:
+        with Pool(processes) as pool:
+            results = pool.map(worker, [(db_file, profile, duration, seed) for seed in range(processes)])
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    reads = sum(r[0] for r in results)
+    writes = sum(r[1] for r in results)
+    locked = sum(r[2] for r in results)
+    return reads, writes, locked
+
+
+def main():
+    source_db = sys.argv[1] if len(sys.argv) > 1 else os.path.join(project_root, "mars_explorer.db")
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    print(f"База: {source_db}, процессов: {processes}, длительность: {duration} с, доля записей: {WRITE_RATIO:.0%}")
+    print(f"{'профиль':<12}{'чтений/с':>12}{'записей/с':>12}{'locked':>10}")
+    for profile in ("default", "production"):
+        reads, writes, locked = run_profile(source_db, profile, processes, duration)
+        print(f"{profile:<12}{reads / duration:>12.1f}{writes / duration:>12.1f}{locked:>10}")
+
+
+if __name__ == "__main__":
+    main()
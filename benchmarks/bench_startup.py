@@ -0,0 +1,96 @@
+"""
+Время холодного старта воркера
+Использование:
+    python benchmarks/bench_startup.py [<запусков>]
+
+Во временном каталоге создается база с начальными данными (migrate + seed),
+затем приложение несколько раз запускается в новом процессе интерпретатора.
+В каждом процессе замеряются этапы: import app, create_app() и первый
+обслуженный запрос (GET /login через тестовый клиент), а снаружи - полное
+время жизни процесса вместе со стартом интерпретатора. Выводится медиана
+и максимум по запускам.
+Цель - медиана полного времени до первого ответа не больше
+STARTUP_TARGET_MS миллисекунд; при превышении код возврата 1.
+"""
+
+import sys
+import os
+import json
+import secrets
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+STARTUP_TARGET_MS = float(os.environ.get("STARTUP_TARGET_MS", 1500))
+PHASES = ['import', 'create_app', 'first_request', 'total']
+
+
+def measure():
+    """Один холодный старт (в дочернем процессе, в каталоге с базой)"""
+    started = time.perf_counter()
+    import app as app_module
+    imported = time.perf_counter()
+    app = app_module.create_app()
+    created = time.perf_counter()
+    response = app.test_client().get('/login')
+    served = time.perf_counter()
+    print(json.dumps({
+        'status': response.status_code,
+        'import': (imported - started) * 1000,
+        'create_app': (created - imported) * 1000,
+        'first_request': (served - created) * 1000,
+    }))
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    from data import db_session
+    from data.seed import seed_initial_data
+
+    db_dir = tempfile.mkdtemp()
+    try:
+        db_session.global_init(os.path.join(db_dir, "mars_explorer.db"), migrate=True)
+        session = db_session.create_session()
+        seed_initial_data(session)
+        session.close()
+        db_session.get_engine().dispose()
+
+        env = dict(os.environ, FLASK_DEBUG="0", FLASK_SECRET_KEY=secrets.token_hex(16))
+        results = {phase: [] for phase in PHASES}
+        for _ in range(runs):
+            started = time.perf_counter()
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure'],
+                                    cwd=db_dir, env=env, capture_output=True, text=True, check=True).stdout
+            total = (time.perf_counter() - started) * 1000
+            sample = json.loads(output.strip().splitlines()[-1])
+            if sample['status'] != 200:
+                print(f"Первый запрос вернул {sample['status']}")
+                return 1
+            sample['total'] = total
+            for phase in PHASES:
+                results[phase].append(sample[phase])
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    print(f"{runs} запусков")
+    print(f"{'этап':<16}{'медиана, мс':>14}{'макс, мс':>12}")
+    for phase in PHASES:
+        print(f"{phase:<16}{statistics.median(results[phase]):>14.1f}{max(results[phase]):>12.1f}")
+
+    median = statistics.median(results['total'])
+    ok = median <= STARTUP_TARGET_MS
+    print(f"\nЦель: {STARTUP_TARGET_MS:.0f} мс, медиана {median:.0f} мс - {'OK' if ok else 'ПРЕВЫШЕНО'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        measure()
+    else:
+        sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Набор бенчмарков маршрутов views.py и задач mars_queries.py
+Использование:
+    python benchmarks/bench_suite.py [<результат.json>] [<базовый.json>]
+
+Для каждого размера данных (BENCH_SIZES, по умолчанию "1000:10000,10000:100000"
+- пары пользователей:работ) во временном каталоге создается база через
+data/seed.py, после чего тестовый клиент Flask проходит все маршруты
+(лента, вход, регистрация, создание/редактирование/удаление работ,
+департаментов и категорий, поиск, API), а затем выполняются все задачи
+mars_queries.py. Каждый размер запускается в отдельном процессе, так как
+data/db_session.py подключается к базе один раз на процесс
+(create_app() для другой базы в том же процессе ее не сменит).
+
+Для каждого сценария записываются перцентили задержки (p50/p95/p99, мс),
+число SQL-запросов и пиковая память Python (tracemalloc, отдельным прогоном,
+чтобы трассировка не искажала время). Результаты сохраняются в JSON
+(по умолчанию bench_results.json). Если передан базовый JSON, сценарии,
+у которых p50 вырос больше чем на BENCH_THRESHOLD (по умолчанию 20%) или
+увеличилось число запросов, выводятся как регрессии, и скрипт завершается
+с кодом 1.
+"""
+
+import sys
+import os
+import builtins
+import contextlib
+import json
+import platform
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+SIZES = os.environ.get("BENCH_SIZES", "1000:10000,10000:100000")
+ITERATIONS = int(os.environ.get("BENCH_ITERATIONS", 20))
+THRESHOLD = float(os.environ.get("BENCH_THRESHOLD", 0.2))
+# Разница меньше этой (мс) не считается регрессией: шум таймера
+MIN_REGRESSION_MS = 1.0
+CAPTAIN = {'email': 'scott_chief@mars.org', 'password': 'captain123'}
+
+
+def percentile(values, q):
+    """Перцентиль по ближайшему рангу"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(name, kind, timings, statements, peak, errors):
+    timings_ms = [timing * 1000 for timing in timings]
+    return {
+        'name': name,
+        'kind': kind,
+        'iterations': len(timings),
+        'p50_ms': round(percentile(timings_ms, 50), 3),
+        'p95_ms': round(percentile(timings_ms, 95), 3),
+        'p99_ms': round(percentile(timings_ms, 99), 3),
+        'mean_ms': round(sum(timings_ms) / len(timings_ms), 3),
+        'max_ms': round(max(timings_ms), 3),
+        'statements': percentile(statements, 50),
+        'statements_max': max(statements),
+        'peak_kb': round(peak / 1024, 1),
+        'errors': errors,
+    }
+
+
+def route_scenarios(ctx):
+    """
+    Сценарии маршрутов: (имя, клиент, функция i -> (метод, адрес, данные)).
+    Клиент "fresh" - новый анонимный клиент на каждый вызов (вход),
+    "anon" - общий анонимный, "captain" - вошедший капитан.
+    """
+    job_id, dept_id, category_id = ctx['job_id'], ctx['dept_id'], ctx['category_id']
+    return [
+        ('GET /', 'captain', lambda i: ('get', '/', None)),
+        ('GET / (фильтры)', 'captain', lambda i: ('get', f'/?finished=0&min_size=10&category={category_id}', None)),
+        ('GET / (следующая страница)', 'captain', lambda i: ('get', '/?after=1000', None)),
+        ('GET /login', 'anon', lambda i: ('get', '/login', None)),
+        ('POST /login', 'fresh', lambda i: ('post', '/login', CAPTAIN)),
+        ('GET /register', 'anon', lambda i: ('get', '/register', None)),
+        ('POST /register', 'anon', lambda i: ('post', '/register', {
+            'surname': 'Bench', 'name': f'User{i}', 'age': 30, 'position': 'engineer',
+            'speciality': 'robotics', 'address': 'module_2', 'email': f'bench{i}@mars.org',
+            'password': 'bench123', 'password_again': 'bench123'})),
+        ('GET /create_job', 'captain', lambda i: ('get', '/create_job', None)),
+        ('POST /create_job', 'captain', lambda i: ('post', '/create_job', {
+            'team_leader': 1, 'job': f'bench job {i}', 'work_size': 10,
+            'collaborators': '2, 3', 'categories': [category_id]})),
+        ('GET /edit_job', 'captain', lambda i: ('get', f'/edit_job/{job_id}', None)),
+        ('POST /edit_job', 'captain', lambda i: ('post', f'/edit_job/{job_id}', {
+            'team_leader': 1, 'job': f'edited job {i}', 'work_size': 10 + i % 5,
+            'collaborators': '2, 3', 'categories': [category_id]})),
+        ('POST /delete_job', 'captain', lambda i: ('post', f"/delete_job/{ctx['jobs_to_delete'].pop()}", None)),
+        ('GET /departments', 'captain', lambda i: ('get', '/departments', None)),
+        ('GET /create_department', 'captain', lambda i: ('get', '/create_department', None)),
+        ('POST /create_department', 'captain', lambda i: ('post', '/create_department', {
+            'title': f'Bench department {i}', 'chief': 1, 'members': '1, 2, 3',
+            'email': f'bench-dept{i}@mars.org'})),
+        ('GET /edit_department', 'captain', lambda i: ('get', f'/edit_department/{dept_id}', None)),
+        ('POST /edit_department', 'captain', lambda i: ('post', f'/edit_department/{dept_id}', {
+            'title': f'Edited department {i}', 'chief': 1, 'members': '1, 2',
+            'email': 'edited-dept@mars.org'})),
+        ('POST /delete_department', 'captain',
+         lambda i: ('post', f"/delete_department/{ctx['departments_to_delete'].pop()}", None)),
+        ('GET /categories', 'captain', lambda i: ('get', '/categories', None)),
+        ('GET /create_category', 'captain', lambda i: ('get', '/create_category', None)),
+        ('POST /create_category', 'captain', lambda i: ('post', '/create_category', {
+            'name': f'Bench category {i}', 'description': 'benchmark'})),
+        ('GET /edit_category', 'captain', lambda i: ('get', f'/edit_category/{category_id}', None)),
+        ('POST /edit_category', 'captain', lambda i: ('post', f'/edit_category/{category_id}', {
+            'name': f'Edited category {i}', 'description': 'benchmark'})),
+        ('POST /delete_category', 'captain',
+         lambda i: ('post', f"/delete_category/{ctx['categories_to_delete'].pop()}", None)),
+        ('GET /search', 'captain', lambda i: ('get', '/search?q=engineer', None)),
+        ('GET /api/v1/jobs', 'captain', lambda i: ('get', '/api/v1/jobs?limit=100', None)),
+        ('GET /logout', 'fresh-captain', lambda i: ('get', '/logout', None)),
+    ]
+
+
+def prepare_deletions(db_sess, ctx, count):
+    """Заранее создает строки, которые будут удалять сценарии delete"""
+    from data.models import Jobs, Department, Category
+    jobs = [Jobs(team_leader=1, job=f'job to delete {i}', work_size=1) for i in range(count)]
+    departments = [Department(title=f'Department to delete {i}', chief=1, email=f'delete{i}@mars.org')
+                   for i in range(count)]
+    categories = [Category(name=f'Category to delete {i}') for i in range(count)]
+    db_sess.add_all(jobs + departments + categories)
+    db_sess.commit()
+    ctx['jobs_to_delete'] = [job.id for job in jobs]
+    ctx['departments_to_delete'] = [dept.id for dept in departments]
+    ctx['categories_to_delete'] = [category.id for category in categories]
+
+
+def run_size(users_count, jobs_count, output):
+    """Прогон одного размера данных (в отдельном процессе, в текущем каталоге)"""
+    from sqlalchemy import event
+    from data import db_session
+    from data.seed import seed_initial_data, generate_colony
+
+    db_session.global_init("mars_explorer.db", migrate=True)
+    db_sess = db_session.create_session()
+    started = time.perf_counter()
+    seed_initial_data(db_sess)
+    generate_colony(db_sess, users=users_count, jobs=jobs_count, departments=10, seed=42)
+    seed_seconds = time.perf_counter() - started
+
+    runs = ITERATIONS + 2  # прогрев + замеры + прогон с tracemalloc
+    ctx = {'job_id': 1, 'dept_id': 1, 'category_id': 1}
+    prepare_deletions(db_sess, ctx, runs)
+    db_sess.close()
+
+    from app import create_app
+    import mars_queries
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    statements = [0]
+    event.listen(db_session.get_engine(), "before_cursor_execute",
+                 lambda *args: statements.__setitem__(0, statements[0] + 1))
+
+    def logged_in_client():
+        client = app.test_client()
+        client.post('/login', data=CAPTAIN)
+        return client
+
+    clients = {'anon': app.test_client(), 'captain': logged_in_client()}
+    results = []
+    counter = 0
+
+    for name, client_kind, make_request in route_scenarios(ctx):
+        timings, counts, errors, peak = [], [], 0, 0
+        for run in range(runs):
+            counter += 1
+            if client_kind == 'fresh':
+                client = app.test_client()
+            elif client_kind == 'fresh-captain':
+                client = logged_in_client()
+            else:
+                client = clients[client_kind]
+            method, url, data = make_request(counter)
+            traced = run == runs - 1
+            if traced:
+                tracemalloc.start()
+            statements[0] = 0
+            request_started = time.perf_counter()
+            response = getattr(client, method)(url, data=data)
+            elapsed = time.perf_counter() - request_started
+            if traced:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            elif run > 0:
+                timings.append(elapsed)
+                counts.append(statements[0])
+            errors += response.status_code >= 400
+            # Флеш-сообщения не показываются и копились бы в cookie сессии
+            with client.session_transaction() as flask_session:
+                flask_session.pop('_flashes', None)
+        results.append(summarize(name, 'route', timings, counts, peak, errors))
+
+    builtins.input = lambda prompt="": "y"
+    for number, (description, task_function) in mars_queries.TASKS.items():
+        timings, counts, errors, peak = [], [], 0, 0
+        for run in range(runs):
+            session = db_session.create_session()
+            traced = run == runs - 1
+            if traced:
+                tracemalloc.start()
+            statements[0] = 0
+            task_started = time.perf_counter()
+            try:
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    task_function(session)
+            except Exception:
+                errors += 1
+            elapsed = time.perf_counter() - task_started
+            if traced:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            elif run > 0:
+                timings.append(elapsed)
+                counts.append(statements[0])
+            session.close()
+        results.append(summarize(f"task {number}: {description}", 'task', timings, counts, peak, errors))
+
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump({'users': users_count, 'jobs': jobs_count,
+                   'seed_seconds': round(seed_seconds, 2), 'results': results}, file, ensure_ascii=False)
+
+
+def parse_sizes(text):
+    return [tuple(int(value) for value in size.split(':')) for size in text.split(',') if size.strip()]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, baseline):
+    """Возвращает список регрессий относительно базового прогона"""
+    base = {(size['users'], size['jobs'], result['name']): result
+            for size in baseline['sizes'] for result in size['results']}
+    regressions = []
+    for size in current['sizes']:
+        for result in size['results']:
+            old = base.get((size['users'], size['jobs'], result['name']))
+            if not old:
+                continue
+            label = f"{size['users']}:{size['jobs']} {result['name']}"
+            slower = result['p50_ms'] - old['p50_ms']
+            if slower > MIN_REGRESSION_MS and result['p50_ms'] > old['p50_ms'] * (1 + THRESHOLD):
+                regressions.append(f"{label}: p50 {old['p50_ms']} -> {result['p50_ms']} мс")
+            if result['statements'] > old['statements']:
+                regressions.append(f"{label}: запросов {old['statements']} -> {result['statements']}")
+    return regressions
+
+
+def main():
+    output = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else "bench_results.json")
+    baseline_file = sys.argv[2] if len(sys.argv) > 2 else None
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'iterations': ITERATIONS,
+        'sizes': [],
+    }
+    for users_count, jobs_count in parse_sizes(SIZES):
+        tmp_dir = tempfile.mkdtemp()
+        size_output = os.path.join(tmp_dir, "result.json")
+        try:
+            print(f"Размер {users_count} пользователей, {jobs_count} работ...")
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--size',
+                            str(users_count), str(jobs_count), size_output],
+                           cwd=tmp_dir, check=True, stdout=subprocess.DEVNULL)
+            with open(size_output, encoding="utf-8") as file:
+                size = json.load(file)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        report['sizes'].append(size)
+
+        print(f"  заполнение: {size['seed_seconds']} с")
+        print(f"  {'сценарий':<46}{'p50':>9}{'p95':>9}{'p99':>9}{'SQL':>6}{'пик, КБ':>10}")
+        for result in size['results']:
+            errors = f"  ошибок: {result['errors']}" if result['errors'] else ""
+            print(f"  {result['name'][:45]:<46}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                  f"{result['p99_ms']:>9.2f}{result['statements']:>6}{result['peak_kb']:>10.0f}{errors}")
+
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты сохранены в {output}")
+
+    if baseline_file:
+        with open(baseline_file, encoding="utf-8") as file:
+            regressions = compare(report, json.load(file))
+        if regressions:
+            print(f"\nРегрессии относительно {baseline_file}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nРегрессий относительно {baseline_file} нет")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--size':
+        run_size(int(sys.argv[2]), int(sys.argv[3]), sys.argv[4])
+    else:
+        main()
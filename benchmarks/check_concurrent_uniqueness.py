@@ -0,0 +1,141 @@
+"""
+Проверка уникальности при параллельных запросах
+Использование:
+    python benchmarks/check_concurrent_uniqueness.py [<клиентов>] [<раундов>]
+
+Во временном каталоге создается база с начальными данными, приложение
+запускается на многопоточном сервере Werkzeug (как в load_test.py).
+В каждом раунде клиенты одновременно (через барьер) регистрируют
+пользователя с одним и тем же email и создают категорию с одним и тем же
+названием. Проверяется, что ни один ответ не 5xx, а в базе ровно одна
+строка с этим email и одна категория с этим названием.
+Код возврата 1 при нарушении.
+"""
+
+import sys
+import os
+import http.cookiejar
+import secrets
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from load_test import CAPTAIN, free_port, wait_for_server, serve
+
+
+def post(opener, url, fields):
+    """POST формы; возвращает код ответа (редиректы не выполняются)"""
+    request = urllib.request.Request(url, data=urllib.parse.urlencode(fields).encode())
+    try:
+        with opener.open(request, timeout=30) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+    except (urllib.error.URLError, OSError):
+        return 599
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def captain_opener(base_url):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar), NoRedirect)
+    post(opener, base_url + '/login', CAPTAIN)
+    return opener
+
+
+def race(clients, send):
+    """Запускает send(номер) во всех клиентах одновременно, возвращает коды ответов"""
+    barrier = threading.Barrier(clients)
+    statuses = [None] * clients
+
+    def worker(index):
+        barrier.wait()
+        statuses[index] = send(index)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    from data import db_session
+    from data.seed import seed_initial_data
+
+    db_dir = tempfile.mkdtemp()
+    db_file = os.path.join(db_dir, "mars_explorer.db")
+    failures = 0
+    process = None
+    try:
+        db_session.global_init(db_file, migrate=True)
+        session = db_session.create_session()
+        seed_initial_data(session)
+        session.close()
+        db_session.get_engine().dispose()
+
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        env = dict(os.environ, FLASK_DEBUG="0", FLASK_SECRET_KEY=secrets.token_hex(16))
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)],
+                                   cwd=db_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not wait_for_server(process, base_url):
+            print("Сервер не запустился")
+            return 1
+
+        openers = [captain_opener(base_url) for _ in range(clients)]
+        anonymous = urllib.request.build_opener(NoRedirect)
+        print(f"{clients} клиентов, {rounds} раундов")
+        for round_number in range(1, rounds + 1):
+            email = f"race{round_number}@mars.org"
+            register = race(clients, lambda index: post(anonymous, base_url + '/register', {
+                'surname': 'Race', 'name': f'Client {index}', 'age': 30, 'position': 'tester',
+                'speciality': 'qa', 'address': 'module_1', 'email': email,
+                'password': 'secret123', 'password_again': 'secret123',
+            }))
+            name = f"Race category {round_number}"
+            category = race(clients, lambda index: post(openers[index], base_url + '/create_category', {
+                'name': name, 'description': f'client {index}',
+            }))
+
+            with sqlite3.connect(db_file) as connection:
+                users = connection.execute("SELECT COUNT(*) FROM users WHERE email = ?", (email,)).fetchone()[0]
+                categories = connection.execute("SELECT COUNT(*) FROM categories WHERE name = ?",
+                                                (name,)).fetchone()[0]
+            for title, statuses, rows in (('регистрация', register, users), ('категория', category, categories)):
+                errors = [status for status in statuses if status >= 500]
+                ok = not errors and rows == 1
+                failures += not ok
+                print(f"раунд {round_number} {title:<12} строк: {rows}, 5xx: {len(errors)}, "
+                      f"коды: {sorted(set(statuses))}  {'OK' if ok else 'ОШИБКА'}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+    print("\nНарушений не найдено" if not failures else f"\nНарушений: {failures}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        serve(int(sys.argv[2]))
+    else:
+        sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Проверка планов запросов (EXPLAIN QUERY PLAN)
+Использование:
+    python benchmarks/check_query_plans.py [<пользователей>] [<работ>]
+
+Во временной базе с синтетическими данными выполняются все задачи
+mars_queries.py и запросы ленты работ index(). Для каждого выполненного
+SQL-запроса строится план; если SQLite читает базовую таблицу полным
+сканированием (SCAN <таблица> без индекса), проверка завершается с кодом 1.
+"""
+
+import sys
+import os
+import builtins
+import contextlib
+import re
+import shutil
+import tempfile
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import event
+from data import db_session
+from data.feed import jobs_page
+from data.models import SqlAlchemyBase
+from data.seed import generate_colony
+import mars_queries
+
+# Пары (проверка, таблица), для которых полное сканирование допустимо.
+# Поиск подстрок в задачах 2, 4 и 8 идет через FTS5 (data/search.py)
+ALLOWED_SCANS = set()
+
+FEED_FILTERS = {
+    'feed': {},
+    'feed: следующая страница': {'after': 100},
+    'feed: завершенные': {'is_finished': True},
+    'feed: тимлид': {'team_leader': 1},
+    'feed: категория': {'category': 1},
+    'feed: объем работ': {'min_size': 10, 'max_size': 20},
+}
+
+SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+def full_scans(connection, statement, parameters):
+    """Возвращает таблицы, которые план запроса читает полным сканированием"""
+    tables = {table.name for table in SqlAlchemyBase.metadata.sorted_tables}
+    cursor = connection.cursor()
+    plan = cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    cursor.close()
+    scans = []
+    for row in plan:
+        match = SCAN_RE.match(row[-1])
+        if match and match.group(1) in tables:
+            scans.append(match.group(1))
+    return scans
+
+
+def main():
+    users_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    jobs_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    tmp_dir = tempfile.mkdtemp()
+    db_file = os.path.join(tmp_dir, "plans.db")
+    try:
+        db_session.global_init(db_file, migrate=True)
+        session = db_session.create_session()
+        generate_colony(session, users=users_count, jobs=jobs_count, departments=10, seed=42)
+        session.commit()
+        session.close()
+
+        captured = []
+        event.listen(db_session.get_engine(), "before_cursor_execute",
+                     lambda conn, cursor, statement, parameters, context, executemany:
+                     captured.append((statement, parameters)))
+        builtins.input = lambda prompt="": "y"
+
+        checks = [(number, task_function) for number, (_, task_function) in mars_queries.TASKS.items()]
+        checks += [(name, lambda session, filters=filters: jobs_page(session, **filters))
+                   for name, filters in FEED_FILTERS.items()]
+
+        failures = 0
+        for name, check in checks:
+            session = db_session.create_session()
+            captured.clear()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                check(session)
+            statements = list(captured)
+            raw = session.connection().connection.dbapi_connection
+            scans = set()
+            for statement, parameters in statements:
+                scans.update(table for table in full_scans(raw, statement, parameters)
+                             if (name, table) not in ALLOWED_SCANS)
+            session.rollback()
+            session.close()
+
+            status = "OK" if not scans else "SCAN " + ", ".join(sorted(scans))
+            failures += bool(scans)
+            print(f"{name:<28}{len(statements):>4} запросов  {status}")
+
+        if failures:
+            print(f"\nПолное сканирование таблиц в {failures} проверках")
+            sys.exit(1)
+        print("\nПолных сканирований таблиц не найдено")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
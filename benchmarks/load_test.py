@@ -0,0 +1,179 @@
+"""
+Нагрузочный тест синхронного и асинхронного пути чтения
+Использование:
+    python benchmarks/load_test.py [<клиентов>] [<секунд>] [<пользователей>] [<работ>]
+
+Во временном каталоге создается база (data/seed.py), затем приложение
+запускается в отдельном процессе на многопоточном сервере Werkzeug дважды:
+с синхронными представлениями (ASYNC_READS=0) и с асинхронным чтением
+через aiosqlite (ASYNC_READS=1). Несколько клиентов одновременно
+запрашивают ленту, департаменты, категории и список работ API; для каждого
+режима и адреса выводится пропускная способность, p50/p95 и число ошибок.
+Асинхронный режим требует asgiref, greenlet и aiosqlite (requirements.txt).
+
+Замер (16 клиентов, 5 с, 10000 пользователей, 100000 работ): sync - 139
+запр/с всего, p50 ленты 147 мс; async - 74 запр/с, p50 ленты 288 мс.
+На потоковом WSGI-сервере каждое async-представление получает свой цикл
+событий и новое соединение (NullPool), поэтому ASYNC_READS выключен по
+умолчанию; выигрыш возможен только под ASGI-сервером.
+"""
+
+import sys
+import os
+import http.cookiejar
+import secrets
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+PATHS = ['/', '/departments', '/categories', '/api/v1/jobs?limit=100']
+CAPTAIN = {'email': 'scott_chief@mars.org', 'password': 'captain123'}
+STARTUP_TIMEOUT = 30
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve(port):
+    """Запуск приложения (в дочернем процессе, в каталоге с базой)"""
+    from app import create_app
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.run(host='127.0.0.1', port=port, threaded=True)
+
+
+def wait_for_server(process, base_url):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            urllib.request.urlopen(base_url + '/login', timeout=1).close()
+            return True
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    return False
+
+
+def login_cookie(base_url):
+    """Входит капитаном и возвращает заголовок Cookie для клиентов"""
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    opener.open(base_url + '/login', data=urllib.parse.urlencode(CAPTAIN).encode()).close()
+    return "; ".join(f"{cookie.name}={cookie.value}" for cookie in jar)
+
+
+def client(base_url, cookie, deadline, results, lock):
+    """Один клиент: по кругу запрашивает PATHS до истечения времени"""
+    local = {path: ([], 0) for path in PATHS}
+    index = 0
+    while time.monotonic() < deadline:
+        path = PATHS[index % len(PATHS)]
+        index += 1
+        request = urllib.request.Request(base_url + path, headers={'Cookie': cookie})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                failed = response.status >= 400
+        except (urllib.error.URLError, OSError):
+            failed = True
+        timings, errors = local[path]
+        timings.append(time.perf_counter() - started)
+        local[path] = (timings, errors + failed)
+    with lock:
+        for path, (timings, errors) in local.items():
+            total_timings, total_errors = results[path]
+            results[path] = (total_timings + timings, total_errors + errors)
+
+
+def run_mode(db_dir, async_reads, clients, duration):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, ASYNC_READS="1" if async_reads else "0", FLASK_DEBUG="0",
+               FLASK_SECRET_KEY=secrets.token_hex(16))
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)],
+                               cwd=db_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        if not wait_for_server(process, base_url):
+            process.kill()
+            error = process.stderr.read().decode(errors='replace').strip().splitlines()
+            return None, error[-1] if error else "сервер не запустился"
+
+        cookie = login_cookie(base_url)
+        results = {path: ([], 0) for path in PATHS}
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+        threads = [threading.Thread(target=client, args=(base_url, cookie, deadline, results, lock))
+                   for _ in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return (results, time.perf_counter() - started), None
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    users_count = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+    jobs_count = int(sys.argv[4]) if len(sys.argv) > 4 else 100000
+
+    from data import db_session
+    from data.seed import seed_initial_data, generate_colony
+
+    db_dir = tempfile.mkdtemp()
+    try:
+        db_session.global_init(os.path.join(db_dir, "mars_explorer.db"), migrate=True)
+        session = db_session.create_session()
+        seed_initial_data(session)
+        generate_colony(session, users=users_count, jobs=jobs_count, departments=10, seed=42)
+        session.close()
+        db_session.get_engine().dispose()
+
+        print(f"\n{clients} клиентов, {duration:.0f} с, {users_count} пользователей, {jobs_count} работ")
+        print(f"{'режим':<8}{'адрес':<28}{'запр/с':>10}{'p50, мс':>10}{'p95, мс':>10}{'ошибок':>8}")
+        for mode, async_reads in (('sync', False), ('async', True)):
+            outcome, error = run_mode(db_dir, async_reads, clients, duration)
+            if outcome is None:
+                print(f"{mode:<8}не удалось запустить: {error}")
+                continue
+            results, elapsed = outcome
+            total = 0
+            for path, (timings, errors) in results.items():
+                total += len(timings)
+                if not timings:
+                    continue
+                print(f"{mode:<8}{path:<28}{len(timings) / elapsed:>10.1f}"
+                      f"{percentile(timings, 50) * 1000:>10.1f}{percentile(timings, 95) * 1000:>10.1f}{errors:>8}")
+            print(f"{mode:<8}{'всего':<28}{total / elapsed:>10.1f}")
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+        serve(int(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,42 @@
+"""
+Обслуживание материализованной статистики колонии (data/stats.py)
+Использование:
+    python colony_stats.py rebuild [<имя_бд>]   - полный пересчет
+    python colony_stats.py check [<имя_бд>]     - сверка с пересчетом с нуля
+"""
+
+import sys
+import time
+from data import db_session, stats
+
+
+def rebuild(db_filename):
+    db_session.global_init(db_filename)
+    started = time.perf_counter()
+    with db_session.get_engine().begin() as connection:
+        stats.rebuild(connection)
+    print(f"Статистика пересчитана за {time.perf_counter() - started:.2f} с")
+
+
+def check(db_filename):
+    db_session.global_init(db_filename)
+    with db_session.get_engine().connect() as connection:
+        problems = stats.check(connection)
+    if not problems:
+        print("Статистика совпадает с данными")
+        return True
+    for kind, keys in problems.items():
+        print(f"Расхождения в статистике {kind}: {', '.join(map(str, keys))}")
+    print("Для исправления выполните: python colony_stats.py rebuild")
+    return False
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ('rebuild', 'check'):
+        print(__doc__)
+        sys.exit(1)
+    db = sys.argv[2] if len(sys.argv) > 2 else "mars_explorer.db"
+    if sys.argv[1] == 'rebuild':
+        rebuild(db)
+    elif not check(db):
+        sys.exit(1)
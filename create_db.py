@@ -1,69 +1,51 @@
+"""
+Создание и заполнение базы данных колонистов
+Использование:
+    python create_db.py [<имя_бд>] [<пользователей> [<работ> [<департаментов> [<зерно>]]]]
+
+Без чисел создаются только начальные данные приложения (капитан, пять
+колонистов, категории, департаменты и первая работа). С числами база
+дополнительно дополняется синтетической колонией до указанного размера
+(от тысяч до десятков миллионов строк); при одинаковом зерне данные
+одинаковые, повторный запуск ничего не дублирует.
+"""
+
 import sys
-from datetime import datetime
+import time
 from data import db_session
-from data.users import User
-from data.jobs import Jobs
-from data.departments import Department
+from data.seed import seed_initial_data, generate_colony
+
+
+def print_progress(table, done, total):
+    print(f"  {table}: {done}/{total}")
 
-def main(db_filename="mars_explorer.db"):
-    db_session.global_init(db_filename)
+
+def main(db_filename="mars_explorer.db", users=0, jobs=0, departments=0, seed=42):
+    db_session.global_init(db_filename, migrate=True)
     session = db_session.create_session()
-    
-    if not session.query(User).filter(User.email == "scott_chief@mars.org").first():
-        # Создаем капитана
-        captain = User(
-            surname="Scott",
-            name="Ridley",
-            age=21,
-            position="captain",
-            speciality="research engineer",
-            address="module_1",
-            email="scott_chief@mars.org"
-        )
-        captain.set_password("secret")
-        session.add(captain)
-        session.flush()
-        
-        # Создаем 5 колонистов
-        colonists = [
-            User(surname="Watson", name="Emma", age=30, position="engineer", speciality="mechanic", address="module_1", email="emma.watson@mars.org"),
-            User(surname="Kovacs", name="Ilya", age=17, position="technician", speciality="electronics", address="module_1", email="ilya.kovacs@mars.org"),
-            User(surname="Lee", name="Anna", age=25, position="biologist", speciality="researcher", address="module_2", email="anna.lee@mars.org"),
-            User(surname="Gonzalez", name="Carlos", age=40, position="chief_engineer", speciality="engineer", address="module_3", email="c.gonzalez@mars.org"),
-            User(surname="Nguyen", name="Linh", age=22, position="middle_scientist", speciality="geologist", address="module_1", email="linh.nguyen@mars.org")
-        ]
-        
-        for c in colonists:
-            c.set_password("password")
-            session.add(c)
-        
-        session.flush()
-        
-        # Создаем первую работу
-        job = Jobs(
-            team_leader=captain.id,
-            job="deployment of residential modules 1 and 2",
-            work_size=15,
-            collaborators="2, 3",
-            start_date=datetime.now(),
-            is_finished=False
-        )
-        session.add(job)
-        
-        # Создаем департамент
-        dept = Department(
-            title="Geological Exploration",
-            chief=5,
-            members="3, 5",
-            email="geo@mars.org"
-        )
-        session.add(dept)
-        
-        session.commit()
+
+    if seed_initial_data(session):
         print("База данных успешно создана и заполнена начальными данными.")
     else:
         print("База данных уже содержит начальные данные.")
 
+    if users or jobs or departments:
+        started = time.perf_counter()
+        added = generate_colony(session, users=users, jobs=jobs, departments=departments,
+                                seed=seed, progress=print_progress)
+        elapsed = time.perf_counter() - started
+        total = sum(added.values())
+        print(f"Добавлено: {added['users']} колонистов, {added['jobs']} работ, "
+              f"{added['departments']} департаментов за {elapsed:.1f} с"
+              + (f" ({total / elapsed:.0f} строк/с)" if total and elapsed else ""))
+    session.close()
+
+
 if __name__ == "__main__":
-    db = sys.argv[1] if len(sys.argv) > 1 else "mars_explorer.db"
-    main(db)
\ No newline at end of file
+    args = sys.argv[1:]
+    if args and args[0] in ('-h', '--help'):
+        print(__doc__)
+        sys.exit(0)
+    db = args[0] if args else "mars_explorer.db"
+    numbers = [int(value) for value in args[1:5]]
+    main(db, *numbers)
@@ -0,0 +1,67 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.pool import NullPool
+from .db_session import apply_sqlite_profile, DEFAULT_PROFILE
+from .feed import filter_jobs, clamp_page_size, DEFAULT_PAGE_SIZE
+from .models import Jobs, Department, Category
+
+# Асинхронный путь чтения для тяжелых GET-страниц (ASYNC_READS=1 в app.py).
+# Модуль требует пакетов aiosqlite и greenlet (sqlalchemy[asyncio]),
+# поэтому импортируется только при включенном асинхронном чтении
+
+__async_engine = None
+__async_factory = None
+
+
+def global_init(db_file, profile=None):
+    """
+    Создает асинхронный движок aiosqlite рядом с синхронным из db_session.
+    Flask выполняет каждое async-представление в собственном цикле событий,
+    а соединения aiosqlite привязаны к циклу, в котором созданы, поэтому
+    пул не используется (NullPool): открытие файла SQLite дешевое.
+    """
+    global __async_engine, __async_factory
+
+    if __async_factory:
+        return
+
+    engine = create_async_engine(f'sqlite+aiosqlite:///{db_file.strip()}', poolclass=NullPool)
+    # PRAGMA профиля выполняются на каждом новом соединении, как и в синхронном движке
+    apply_sqlite_profile(engine.sync_engine, profile or DEFAULT_PROFILE)
+    __async_engine = engine
+    __async_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+
+def create_session() -> AsyncSession:
+    global __async_factory
+    return __async_factory()
+
+
+async def jobs_page(db_sess, after=None, limit=DEFAULT_PAGE_SIZE, **filters):
+    """Асинхронный вариант data.feed.jobs_page: те же фильтры, keyset-пагинация и загрузка связей"""
+    limit = clamp_page_size(limit)
+    statement = filter_jobs(select(Jobs), **filters).filter(Jobs.id > (after or 0)).options(
+        joinedload(Jobs.team_leader_user),
+        selectinload(Jobs.categories)
+    ).order_by(Jobs.id).limit(limit + 1)
+    jobs = (await db_sess.scalars(statement)).all()
+
+    next_cursor = None
+    if len(jobs) > limit:
+        jobs = jobs[:limit]
+        next_cursor = jobs[-1].id
+    return jobs, next_cursor
+
+
+async def departments(db_sess):
+    """Департаменты вместе с начальниками одним запросом"""
+    statement = select(Department).options(joinedload(Department.chief_user))
+    return (await db_sess.scalars(statement)).all()
+
+
+async def categories(db_sess, by_name=False):
+    statement = select(Category)
+    if by_name:
+        statement = statement.order_by(Category.name)
+    return (await db_sess.scalars(statement)).all()
@@ -0,0 +1,106 @@
+import os
+from datetime import datetime
+from sqlalchemy import delete, insert, select, update
+from .models import User, Jobs, Category, jobs_to_categories, job_collaborators
+from . import stats
+
+# Массовые операции над работами: одна транзакция, один UPDATE/DELETE
+# по множеству ID. Права проверяются в WHERE того же запроса
+BULK_ACTIONS = {
+    'finish': 'Завершить',
+    'reopen': 'Возобновить',
+    'reassign': 'Сменить тимлида',
+    'recategorize': 'Заменить категории',
+    'delete': 'Удалить',
+}
+MAX_BULK_JOBS = int(os.environ.get("MAX_BULK_JOBS", 500))
+
+# Результат для каждого ID
+OK = 'ok'
+FORBIDDEN = 'forbidden'
+NOT_FOUND = 'not_found'
+
+
+class BulkError(Exception):
+    """Неверный запрос массовой операции целиком (действие, параметры, число работ)"""
+
+
+def parse_job_ids(values):
+    """ID работ из списка строк формы/JSON без повторов, в порядке ввода"""
+    ids = []
+    for value in values or []:
+        try:
+            job_id = int(value)
+        except (TypeError, ValueError):
+            raise BulkError(f"Неверный ID работы: {value}")
+        if job_id not in ids:
+            ids.append(job_id)
+    if not ids:
+        raise BulkError("Не выбрано ни одной работы")
+    if len(ids) > MAX_BULK_JOBS:
+        raise BulkError(f"За один раз можно изменить не больше {MAX_BULK_JOBS} работ")
+    return ids
+
+
+def apply_bulk(db_sess, permissions, job_ids, action, team_leader=None, category_ids=None):
+    """
+    Применяет действие к работам одним запросом в текущей транзакции (без commit).
+    Права (data.permissions.Permissions) проверяются условием WHERE.
+    Возвращает ({ID: ok/forbidden/not_found}, множество измененных ID).
+    """
+    if action not in BULK_ACTIONS:
+        raise BulkError(f"Неизвестное действие: {action}")
+    allowed = permissions.job_filter()
+
+    if action == 'reassign':
+        if team_leader is None or db_sess.get(User, team_leader) is None:
+            raise BulkError(f"Пользователь {team_leader} не найден")
+    if action == 'recategorize':
+        category_ids = set(category_ids or [])
+        known = set(db_sess.execute(select(Category.id).where(Category.id.in_(category_ids))).scalars())
+        if category_ids - known:
+            raise BulkError(f"Категории не найдены: {', '.join(map(str, sorted(category_ids - known)))}")
+
+    # Работы, доступные пользователю, и их состояние до изменения (для разностей статистики)
+    targets = set(db_sess.execute(select(Jobs.id).where(Jobs.id.in_(job_ids), allowed)).scalars())
+    old_states = stats.job_states(db_sess.connection(), targets)
+
+    changed = set()
+    if targets:
+        now = datetime.utcnow()
+        where = (Jobs.id.in_(targets), allowed)
+        if action in ('finish', 'reopen'):
+            finished = action == 'finish'
+            changed = set(db_sess.execute(
+                update(Jobs).where(*where).values(is_finished=finished, end_date=now if finished else None,
+                                                  modified_date=now).returning(Jobs.id)
+            ).scalars())
+        elif action == 'reassign':
+            changed = set(db_sess.execute(
+                update(Jobs).where(*where).values(team_leader=team_leader, modified_date=now).returning(Jobs.id)
+            ).scalars())
+        elif action == 'recategorize':
+            changed = set(db_sess.execute(
+                update(Jobs).where(*where).values(modified_date=now).returning(Jobs.id)
+            ).scalars())
+            db_sess.execute(delete(jobs_to_categories).where(jobs_to_categories.c.job_id.in_(changed)))
+            if category_ids and changed:
+                db_sess.execute(insert(jobs_to_categories), [
+                    {'job_id': job_id, 'category_id': category_id}
+                    for job_id in sorted(changed) for category_id in sorted(category_ids)
+                ])
+        elif action == 'delete':
+            changed = set(db_sess.execute(delete(Jobs).where(*where).returning(Jobs.id)).scalars())
+            db_sess.execute(delete(job_collaborators).where(job_collaborators.c.job_id.in_(changed)))
+            db_sess.execute(delete(jobs_to_categories).where(jobs_to_categories.c.job_id.in_(changed)))
+
+        # Запросы шли в обход ORM: статистика меняется на разность состояний
+        stats.apply_job_changes(db_sess.connection(), {job_id: old_states[job_id] for job_id in changed},
+                                stats.job_states(db_sess.connection(), changed))
+
+    # Причина отказа для остальных ID: работы нет или нет прав
+    rest = [job_id for job_id in job_ids if job_id not in changed]
+    existing = set(db_sess.execute(select(Jobs.id).where(Jobs.id.in_(rest))).scalars()) if rest else set()
+    results = {job_id: OK if job_id in changed else FORBIDDEN if job_id in existing else NOT_FOUND
+               for job_id in job_ids}
+    return results, changed
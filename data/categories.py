@@ -0,0 +1,61 @@
+import os
+from sqlalchemy import delete, insert, select
+from .cache import LRUCache
+from .models import Category, jobs_to_categories
+from .versions import table_versions
+from . import stats
+
+# Список категорий для форм работ кэшируется по версии таблицы categories
+# (change_counters): проверка версии - один SELECT по первичному ключу,
+# любое изменение категорий в любом воркере меняет версию
+CATEGORY_CACHE_SIZE = int(os.environ.get("CATEGORY_CACHE_SIZE", 4))
+
+category_cache = LRUCache(maxsize=CATEGORY_CACHE_SIZE)
+
+
+def category_choices(db_sess):
+    """Варианты выбора категорий ((id, name), ...) из кэша текущей версии таблицы"""
+    (version,), _ = table_versions(db_sess, ['categories'])
+    choices = category_cache.get(version)
+    if choices is None:
+        choices = tuple((category_id, name) for category_id, name in
+                        db_sess.query(Category.id, Category.name).order_by(Category.id))
+        category_cache.set(version, choices)
+    return choices
+
+
+def job_category_ids(db_sess, job_id):
+    """ID категорий работы прямо из таблицы связей, без загрузки объектов Category"""
+    return set(db_sess.execute(
+        select(jobs_to_categories.c.category_id).where(jobs_to_categories.c.job_id == job_id)
+    ).scalars())
+
+
+def set_job_categories(db_sess, job_id, category_ids):
+    """
+    Сохраняет категории работы как разность множеств: текущие связи читаются
+    без autoflush, затем один DELETE убранных, один executemany INSERT
+    добавленных и одно обновление category_stats разностями.
+    Возвращает множество категорий, которых коснулось изменение.
+    """
+    wanted = set(category_ids or [])
+    connection = db_sess.connection()
+    # Несохраненные изменения работы запишет следующий flush со своей разностью:
+    # до конца функции flush не нужен, иначе разность считалась бы от устаревшего состояния
+    with db_sess.no_autoflush:
+        old = stats.job_states(connection, [job_id]).get(job_id)
+        if old is None:
+            return set()
+        removed, added = old.categories - wanted, wanted - old.categories
+        if removed:
+            db_sess.execute(delete(jobs_to_categories).where(
+                jobs_to_categories.c.job_id == job_id,
+                jobs_to_categories.c.category_id.in_(removed)
+            ))
+        if added:
+            db_sess.execute(insert(jobs_to_categories),
+                            [{'job_id': job_id, 'category_id': category_id} for category_id in sorted(added)])
+        # Связи изменены в обход ORM, поэтому статистика категорий меняется явно
+        if removed or added:
+            stats.apply_job_changes(connection, {job_id: old}, {job_id: old._replace(categories=frozenset(wanted))})
+    return removed | added
@@ -1,14 +1,68 @@
+import os
+import functools
+import threading
+import time
 import sqlalchemy as sa
 import sqlalchemy.orm as orm
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
 import sqlalchemy.ext.declarative as dec
 
 SqlAlchemyBase = dec.declarative_base()
 
 __factory = None
+__scoped = None
+__engine = None
 
-def global_init(db_file):
-    global __factory
+# Параметры пула соединений по умолчанию (можно переопределить через окружение)
+DEFAULT_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DEFAULT_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DEFAULT_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+
+# Профили настройки SQLite: PRAGMA выполняются для каждого нового соединения
+SQLITE_PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',         # читатели не блокируются писателями
+        'synchronous': 'NORMAL',       # в режиме WAL безопасно и намного быстрее FULL
+        'cache_size': -64000,          # 64 МБ страничного кэша
+        'mmap_size': 268435456,        # 256 МБ отображения файла в память
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,          # ждать освобождения блокировки до 5 секунд
+    },
+}
+DEFAULT_PROFILE = os.environ.get("DB_PROFILE", "production")
+
+# Повторы операций записи, наткнувшихся на блокировку базы
+LOCK_RETRY_ATTEMPTS = int(os.environ.get("DB_LOCK_RETRIES", 5))
+LOCK_RETRY_DELAY = 0.05
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool, который учитывает время ожидания свободного соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.wait_count += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+def global_init(db_file, pool_size=None, max_overflow=None, pool_timeout=None, profile=None, profiling=None,
+                migrate=False):
+    global __factory, __scoped, __engine
 
     if __factory:
         return
@@ -17,18 +71,137 @@ def global_init(db_file):
         raise Exception("Необходимо указать файл базы данных.")
 
     conn_str = f'sqlite:///{db_file.strip()}?check_same_thread=False'
-    print(f"Подключение к базе данных по адресу {conn_str}")
 
-    engine = sa.create_engine(conn_str, echo=False)
+    engine = sa.create_engine(
+        conn_str,
+        echo=False,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size if pool_size is not None else DEFAULT_POOL_SIZE,
+        max_overflow=max_overflow if max_overflow is not None else DEFAULT_MAX_OVERFLOW,
+        pool_timeout=pool_timeout if pool_timeout is not None else DEFAULT_POOL_TIMEOUT,
+        pool_pre_ping=True
+    )
+    apply_sqlite_profile(engine, profile or DEFAULT_PROFILE)
+    register_sql_functions(engine)
+    # Замер SQL для профилирования запросов (PERF_PROFILING=1, см. data/profiling.py)
+    from .profiling import install, PROFILING_ENABLED
+    if profiling if profiling is not None else PROFILING_ENABLED:
+        install(engine)
+    __engine = engine
     __factory = orm.sessionmaker(bind=engine)
+    # Сессия в рамках запроса: одна на поток, закрывается в remove_session()
+    __scoped = orm.scoped_session(__factory)
 
     # Импорт всех моделей (только один раз)
-    from .models import User, Jobs, Department, Category
-    
-    # Создание таблиц
+    from . import models
+
+    # Схема меняется только явно: python migrate.py или migrate=True
+    if migrate:
+        run_migrations(engine)
+
+def run_migrations(engine=None):
+    """
+    Создает таблицы, недостающие колонки и индексы, поисковые индексы FTS5,
+    заполняет материализованную статистику и назначает капитана (разовый
+    шаг, см. schema.run_once). Повторный запуск на актуальной базе ничего не меняет.
+    """
+    engine = engine or __engine
+    from .schema import add_missing_columns, create_missing_indexes, create_search_index, run_once
+    from .stats import ensure_stats
+    from .permissions import assign_default_captain
     SqlAlchemyBase.metadata.create_all(engine)
-    print("✅ Таблицы базы данных успешно созданы")
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
+    create_search_index(engine)
+    ensure_stats(engine)
+    run_once(engine, 'assign_default_captain', assign_default_captain)
+
+def apply_sqlite_profile(engine, profile):
+    """Подключает выполнение PRAGMA выбранного профиля к каждому соединению"""
+    if profile not in SQLITE_PROFILES:
+        raise Exception(f"Неизвестный профиль базы данных: {profile}")
+    pragmas = SQLITE_PROFILES[profile]
+    if not pragmas:
+        return
+
+    @sa.event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def casefold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+def register_sql_functions(engine):
+    """
+    Регистрирует на каждом соединении функции SQL, которых нет в SQLite:
+    casefold(x) - приведение регистра для любых алфавитов (встроенные
+    lower() и LIKE понимают только ASCII)
+    """
+    @sa.event.listens_for(engine, "connect")
+    def create_sql_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function("casefold", 1, casefold, deterministic=True)
+
+def is_lock_error(error):
+    """Проверяет, что ошибка вызвана блокировкой базы другим писателем"""
+    message = str(getattr(error, 'orig', error)).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+def retry_on_lock(func):
+    """
+    Повторяет единицу работы (например, представление с записью), если
+    фиксация транзакции упала из-за блокировки базы. Перед повтором
+    сессия запроса откатывается, задержка растет экспоненциально.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(LOCK_RETRY_ATTEMPTS):
+            try:
+                return func(*args, **kwargs)
+            except sa.exc.OperationalError as error:
+                if not is_lock_error(error) or attempt == LOCK_RETRY_ATTEMPTS - 1:
+                    raise
+                get_session().rollback()
+                time.sleep(LOCK_RETRY_DELAY * 2 ** attempt)
+    return wrapper
 
 def create_session() -> Session:
     global __factory
-    return __factory()
\ No newline at end of file
+    return __factory()
+
+def get_session() -> Session:
+    """Возвращает сессию текущего запроса (общую для load_user и представления)"""
+    global __scoped
+    return __scoped()
+
+def remove_session():
+    """Закрывает сессию текущего запроса и возвращает соединение в пул"""
+    global __scoped
+    if __scoped is not None:
+        __scoped.remove()
+
+def get_engine():
+    global __engine
+    return __engine
+
+def pool_stats():
+    """Метрики пула соединений: занятые соединения, overflow и время ожидания"""
+    global __engine
+    if __engine is None:
+        return {}
+    pool = __engine.pool
+    stats = {
+        'pool_size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': pool.overflow(),
+    }
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats['wait_count'] = pool.wait_count
+            stats['wait_total'] = round(pool.wait_total, 6)
+            stats['wait_max'] = round(pool.wait_max, 6)
+            stats['wait_avg'] = round(pool.wait_total / pool.wait_count, 6) if pool.wait_count else 0.0
+    return stats
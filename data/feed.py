@@ -0,0 +1,66 @@
+from sqlalchemy.orm import joinedload, selectinload
+from .models import Jobs, Category
+
+# Ограничения размера страницы ленты работ
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def clamp_page_size(limit):
+    """Приводит запрошенный размер страницы к допустимому диапазону"""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_feed_filters(args):
+    """Разбор фильтров ленты работ из строки запроса"""
+    finished = args.get('finished')
+    return {
+        'is_finished': {'1': True, '0': False}.get(finished),
+        'team_leader': args.get('team_leader', type=int),
+        'category': args.get('category', type=int),
+        'min_size': args.get('min_size', type=int),
+        'max_size': args.get('max_size', type=int),
+    }
+
+
+def filter_jobs(query, is_finished=None, team_leader=None, category=None,
+                min_size=None, max_size=None):
+    """Накладывает серверные фильтры ленты на запрос к Jobs"""
+    if is_finished is not None:
+        query = query.filter(Jobs.is_finished == is_finished)
+    if team_leader is not None:
+        query = query.filter(Jobs.team_leader == team_leader)
+    if category is not None:
+        query = query.filter(Jobs.categories.any(Category.id == category))
+    if min_size is not None:
+        query = query.filter(Jobs.work_size >= min_size)
+    if max_size is not None:
+        query = query.filter(Jobs.work_size <= max_size)
+    return query
+
+
+def jobs_page(db_sess, after=None, limit=DEFAULT_PAGE_SIZE, **filters):
+    """
+    Возвращает страницу работ по ключу (keyset-пагинация по Jobs.id)
+    и курсор следующей страницы (None, если страница последняя).
+    Вместо OFFSET используется условие id > after, поэтому время ответа
+    не зависит от номера страницы и размера таблицы.
+    """
+    limit = clamp_page_size(limit)
+    # Первая страница - это курсор 0: так SQLite всегда ищет по диапазону
+    # первичного ключа, а не сканирует таблицу
+    query = filter_jobs(db_sess.query(Jobs), **filters).filter(Jobs.id > (after or 0))
+
+    # Берем на одну запись больше, чтобы узнать, есть ли следующая страница
+    jobs = query.options(
+        joinedload(Jobs.team_leader_user),
+        selectinload(Jobs.categories)
+    ).order_by(Jobs.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(jobs) > limit:
+        jobs = jobs[:limit]
+        next_cursor = jobs[-1].id
+    return jobs, next_cursor
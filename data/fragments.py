@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import threading
+import time
+from .cache import LRUCache
+
+# Кэш отрендеренных фрагментов страниц (карточки работ, департаменты).
+# Запись хранит версию строки: если версия изменилась, фрагмент рендерится заново
+FRAGMENT_CACHE_BACKEND = os.environ.get("FRAGMENT_CACHE_BACKEND", "memory")
+FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", 20000))
+FRAGMENT_CACHE_PATH = os.environ.get("FRAGMENT_CACHE_PATH", "fragment_cache.db")
+
+
+class MemoryBackend:
+    """Хранилище в памяти процесса (LRU)"""
+
+    def __init__(self, maxsize=FRAGMENT_CACHE_SIZE):
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, version, html, render_time):
+        self._cache.set(key, (version, html, render_time))
+
+    def delete(self, *keys):
+        for key in keys:
+            self._cache.delete(key)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class SQLiteBackend:
+    """Хранилище в локальном файле SQLite, общее для всех воркеров на машине"""
+
+    def __init__(self, path=FRAGMENT_CACHE_PATH):
+        # Соединения открываются при первом обращении, отдельно в каждом
+        # процессе и потоке: модуль импортируется в мастере gunicorn --preload,
+        # и соединение, открытое до fork, досталось бы всем воркерам
+        self.path = path
+        self._lock = threading.Lock()
+        self._pid = None
+        self._local = None
+
+    def _connection(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._local = threading.local()
+                    self._pid = pid
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS fragments ("
+                "key TEXT PRIMARY KEY, version TEXT NOT NULL, html TEXT NOT NULL, render_time REAL NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        return self._connection().execute(
+            "SELECT version, html, render_time FROM fragments WHERE key = ?", (key,)
+        ).fetchone()
+
+    def set(self, key, version, html, render_time):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO fragments (key, version, html, render_time) VALUES (?, ?, ?, ?)",
+            (key, version, html, render_time)
+        )
+
+    def delete(self, *keys):
+        self._connection().executemany("DELETE FROM fragments WHERE key = ?", [(key,) for key in keys])
+
+    def clear(self):
+        self._connection().execute("DELETE FROM fragments")
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+class FragmentCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.render_time = 0.0
+        self.render_time_saved = 0.0
+
+    def render(self, key, version, render_function):
+        """Возвращает фрагмент из кэша, если версия совпадает, иначе рендерит и сохраняет"""
+        version = str(version)
+        entry = self.backend.get(key)
+        if entry is not None and entry[0] == version:
+            with self._lock:
+                self.hits += 1
+                self.render_time_saved += entry[2]
+            return entry[1]
+
+        started = time.perf_counter()
+        html = render_function()
+        elapsed = time.perf_counter() - started
+        self.backend.set(key, version, html, elapsed)
+        with self._lock:
+            self.misses += 1
+            self.render_time += elapsed
+        return html
+
+    def invalidate(self, *keys):
+        if keys:
+            self.backend.delete(*keys)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'render_time': round(self.render_time, 6),
+                'render_time_saved': round(self.render_time_saved, 6),
+            }
+
+
+def job_key(job_id):
+    return f"job:{job_id}"
+
+
+def department_key(department_id):
+    return f"department:{department_id}"
+
+
+fragment_cache = FragmentCache(BACKENDS[FRAGMENT_CACHE_BACKEND]())
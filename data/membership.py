@@ -0,0 +1,71 @@
+from sqlalchemy import insert
+from .models import User, Jobs, Department, job_collaborators, department_members
+from .stats import rebuild
+
+
+def parse_ids(text):
+    """Разбирает строку ID через запятую ("2, 3", "[1,2]") в список без повторов"""
+    if not text:
+        return []
+    ids = []
+    for part in text.strip('[] ').split(','):
+        part = part.strip()
+        if part.isdigit() and int(part) not in ids:
+            ids.append(int(part))
+    return ids
+
+
+def format_ids(ids):
+    """Обратное преобразование для отображения в формах"""
+    return ", ".join(str(user_id) for user_id in ids)
+
+
+def existing_users(db_sess, ids):
+    """Возвращает пользователей с указанными ID в порядке ввода (один SELECT ... IN)"""
+    if not ids:
+        return []
+    users = {user.id: user for user in db_sess.query(User).filter(User.id.in_(ids))}
+    return [users[user_id] for user_id in ids if user_id in users]
+
+
+def set_job_collaborators(db_sess, job, text):
+    """Сохраняет участников работы из строки формы в job_collaborators"""
+    users = existing_users(db_sess, parse_ids(text))
+    job.collaborator_users = users
+    job.collaborators = format_ids(user.id for user in users)
+
+
+def set_department_members(db_sess, dept, text):
+    """Сохраняет членов департамента из строки формы в department_members"""
+    users = existing_users(db_sess, parse_ids(text))
+    dept.member_users = users
+    dept.members = format_ids(user.id for user in users)
+
+
+def migrate_memberships(db_sess):
+    """
+    Разовая миграция: переносит строки Jobs.collaborators и Department.members
+    в таблицы связей. Повторный запуск безопасен (INSERT OR IGNORE).
+    Возвращает число обработанных связей работ и департаментов.
+    """
+    user_ids = {user_id for user_id, in db_sess.query(User.id)}
+
+    job_rows = [
+        {'job_id': job_id, 'user_id': user_id}
+        for job_id, text in db_sess.query(Jobs.id, Jobs.collaborators)
+        for user_id in parse_ids(text) if user_id in user_ids
+    ]
+    member_rows = [
+        {'department_id': dept_id, 'user_id': user_id}
+        for dept_id, text in db_sess.query(Department.id, Department.members)
+        for user_id in parse_ids(text) if user_id in user_ids
+    ]
+
+    if job_rows:
+        db_sess.execute(insert(job_collaborators).prefix_with('OR IGNORE'), job_rows)
+    if member_rows:
+        db_sess.execute(insert(department_members).prefix_with('OR IGNORE'), member_rows)
+    # Связи вставлены в обход ORM: команды и состав департаментов пересчитываются
+    rebuild(db_sess.connection())
+    db_sess.commit()
+    return len(job_rows), len(member_rows)
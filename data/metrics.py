@@ -0,0 +1,220 @@
+import json
+import os
+import threading
+import time
+from flask import g, request
+from sqlalchemy import func, select
+from .cache import LRUCache
+from .models import User, Jobs, Department, Category
+
+# Каталог, через который воркеры (процессы gunicorn) объединяют метрики:
+# каждый процесс пишет свои значения в metrics_<pid>.json, /metrics
+# суммирует все файлы. Каталог очищается при развертывании
+METRICS_DIR = os.environ.get("METRICS_DIR", "metrics")
+# Как часто процесс сбрасывает свои счетчики в файл (секунды)
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 1.0))
+# Число строк в таблицах считается не чаще раза в ROW_COUNT_TTL секунд
+ROW_COUNT_TTL = float(os.environ.get("METRICS_ROW_COUNT_TTL", 30))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Имя -> (тип, описание)
+METRICS = {
+    'mars_http_requests_total': ('counter', 'HTTP-запросы по обработчику, методу и статусу'),
+    'mars_http_request_duration_seconds': ('histogram', 'Время обработки HTTP-запроса'),
+    'mars_http_errors_total': ('counter', 'Ответы со статусом 5xx'),
+    'mars_login_attempts_total': ('counter', 'Попытки входа по результату'),
+    'mars_db_pool_size': ('gauge', 'Размер пула соединений'),
+    'mars_db_pool_checked_out': ('gauge', 'Занятые соединения пула'),
+    'mars_db_pool_overflow': ('gauge', 'Соединения сверх размера пула'),
+    'mars_db_pool_wait_seconds_total': ('counter', 'Суммарное ожидание свободного соединения'),
+    'mars_db_pool_checkouts_total': ('counter', 'Выдачи соединений из пула'),
+    'mars_table_rows': ('gauge', 'Число строк в таблице'),
+}
+
+ROW_COUNT_TABLES = {'users': User, 'jobs': Jobs, 'departments': Department, 'categories': Category}
+_row_counts = LRUCache(maxsize=1, ttl=ROW_COUNT_TTL)
+
+
+class Registry:
+    """Счетчики, гистограммы и датчики одного процесса; сбрасываются в файл METRICS_DIR"""
+
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauge_callback = None
+        self._flushed = 0.0
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, tuple(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(labels))
+        with self._lock:
+            buckets, total, count = self.histograms.get(key) or ([0] * len(LATENCY_BUCKETS), 0.0, 0)
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    buckets[index] += 1
+            self.histograms[key] = (buckets, total + value, count + 1)
+
+    def path(self, pid=None):
+        return os.path.join(self.directory, f"metrics_{pid or os.getpid()}.json")
+
+    def flush(self, force=False):
+        """Записывает значения процесса в его файл (не чаще METRICS_FLUSH_INTERVAL)"""
+        now = time.monotonic()
+        if not force and now - self._flushed < METRICS_FLUSH_INTERVAL:
+            return
+        self._flushed = now
+        gauges = self.gauge_callback() if self.gauge_callback else {}
+        with self._lock:
+            data = {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), buckets, total, count]
+                               for (name, labels), (buckets, total, count) in self.histograms.items()],
+                'gauges': [[name, list(labels), value] for (name, labels), value in gauges.items()],
+            }
+        os.makedirs(self.directory, exist_ok=True)
+        # Запись во временный файл и переименование: читатель не увидит половину файла
+        temporary = self.path() + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temporary, self.path())
+
+    def collect(self):
+        """Суммирует метрики всех процессов; датчики берутся только у живых процессов"""
+        self.flush(force=True)
+        counters, histograms, gauges = {}, {}, {}
+        for filename in sorted(os.listdir(self.directory)):
+            if not (filename.startswith("metrics_") and filename.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), encoding="utf-8") as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in data['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, buckets, total, count in data['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                old_buckets, old_total, old_count = histograms.get(key) or ([0] * len(buckets), 0.0, 0)
+                histograms[key] = ([a + b for a, b in zip(old_buckets, buckets)], old_total + total, old_count + count)
+            pid = int(filename[len("metrics_"):-len(".json")])
+            if process_alive(pid):
+                for name, labels, value in data['gauges']:
+                    gauges[(name, tuple(map(tuple, labels)))] = value
+        return counters, histograms, gauges
+
+
+def process_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+registry = Registry()
+
+
+def pool_gauges(stats):
+    """Метрики пула соединений процесса из db_session.pool_stats() с меткой pid"""
+    pid = (('pid', str(os.getpid())),)
+    gauges = {
+        ('mars_db_pool_size', pid): stats.get('pool_size', 0),
+        ('mars_db_pool_checked_out', pid): stats.get('checked_out', 0),
+        ('mars_db_pool_overflow', pid): stats.get('overflow', 0),
+    }
+    if 'wait_count' in stats:
+        gauges[('mars_db_pool_wait_seconds_total', pid)] = stats['wait_total']
+        gauges[('mars_db_pool_checkouts_total', pid)] = stats['wait_count']
+    return gauges
+
+
+def row_counts(db_sess):
+    """Число строк в основных таблицах одним запросом, с кэшем на ROW_COUNT_TTL"""
+    counts = _row_counts.get('rows')
+    if counts is None:
+        row = db_sess.execute(select(*[
+            select(func.count()).select_from(model).scalar_subquery().label(name)
+            for name, model in ROW_COUNT_TABLES.items()
+        ])).one()
+        counts = dict(row._mapping)
+        _row_counts.set('rows', counts)
+    return counts
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(db_sess):
+    """Все метрики в текстовом формате Prometheus"""
+    counters, histograms, gauges = registry.collect()
+    for table, count in row_counts(db_sess).items():
+        gauges[('mars_table_rows', (('table', table),))] = count
+
+    samples = {}
+    for (name, labels), value in sorted(list(counters.items()) + list(gauges.items())):
+        samples.setdefault(name, []).append(f"{name}{format_labels(labels)} {format_value(value)}")
+    for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+        lines = samples.setdefault(name, [])
+        for bound, bucket in zip(LATENCY_BUCKETS, buckets):
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', str(bound)),))} {bucket}")
+        lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+        lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+    output = []
+    for name, (kind, description) in METRICS.items():
+        output.append(f"# HELP {name} {description}")
+        output.append(f"# TYPE {name} {kind}")
+        output.extend(samples.get(name, []))
+    return "\n".join(output) + "\n"
+
+
+def count_login(success):
+    registry.inc('mars_login_attempts_total', (('result', 'success' if success else 'failure'),))
+
+
+def start_request():
+    g.metrics_started = time.perf_counter()
+
+
+def finish_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    registry.observe('mars_http_request_duration_seconds', (('endpoint', endpoint),),
+                     time.perf_counter() - started)
+    registry.inc('mars_http_requests_total', (('endpoint', endpoint), ('method', request.method),
+                                              ('status', str(response.status_code))))
+    if response.status_code >= 500:
+        registry.inc('mars_http_errors_total', (('endpoint', endpoint),))
+    registry.flush()
+    return response
+
+
+def init_app(app, pool_stats=None):
+    """Подключает сбор метрик HTTP-запросов к приложению"""
+    if pool_stats is not None:
+        registry.gauge_callback = lambda: pool_gauges(pool_stats())
+    app.before_request(start_request)
+    app.after_request(finish_request)
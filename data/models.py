@@ -1,18 +1,88 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship, configure_mappers
 from .db_session import SqlAlchemyBase
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from .passwords import hash_password, needs_rehash
 from datetime import datetime
 from flask_login import UserMixin
 
 # Промежуточная таблица для связи многие-ко-многим (определяется ДО моделей)
 jobs_to_categories = Table('jobs_to_categories', SqlAlchemyBase.metadata,
     Column('job_id', Integer, ForeignKey('jobs.id')),
-    Column('category_id', Integer, ForeignKey('categories.id'))
+    Column('category_id', Integer, ForeignKey('categories.id')),
+    # Уникальный составной ключ: одна связь работа-категория и поиск по job_id
+    Index('ux_jobs_to_categories_job_category', 'job_id', 'category_id', unique=True),
+    Index('ix_jobs_to_categories_category_id', 'category_id')
+)
+
+# Участники работ: раньше хранились строкой Jobs.collaborators ("2, 3")
+job_collaborators = Table('job_collaborators', SqlAlchemyBase.metadata,
+    Column('job_id', Integer, ForeignKey('jobs.id', ondelete='CASCADE'), primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    Index('ix_job_collaborators_user_id', 'user_id')
+)
+
+# Члены департаментов: раньше хранились строкой Department.members ("1,2,3")
+department_members = Table('department_members', SqlAlchemyBase.metadata,
+    Column('department_id', Integer, ForeignKey('departments.id', ondelete='CASCADE'), primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    Index('ix_department_members_user_id', 'user_id')
+)
+
+# Счетчики изменений таблиц: из них строятся ETag страниц-списков
+change_counters = Table('change_counters', SqlAlchemyBase.metadata,
+    Column('name', String, primary_key=True),
+    Column('version', Integer, nullable=False, default=0),
+    Column('modified_date', DateTime, default=datetime.utcnow)
+)
+
+# Выполненные разовые шаги миграций (data/schema.py run_once)
+schema_migrations = Table('schema_migrations', SqlAlchemyBase.metadata,
+    Column('name', String, primary_key=True),
+    Column('applied_date', DateTime, default=datetime.utcnow)
+)
+
+# Материализованная статистика колонии (поддерживается data/stats.py)
+user_stats = Table('user_stats', SqlAlchemyBase.metadata,
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+    Column('jobs_led', Integer, nullable=False, default=0),
+    Column('finished_jobs_led', Integer, nullable=False, default=0),
+    Column('work_size', Integer, nullable=False, default=0),
+    Column('finished_work_size', Integer, nullable=False, default=0),
+    Column('collaborations', Integer, nullable=False, default=0),
+    Index('ix_user_stats_finished_work_size', 'finished_work_size')
+)
+
+job_stats = Table('job_stats', SqlAlchemyBase.metadata,
+    Column('job_id', Integer, ForeignKey('jobs.id', ondelete='CASCADE'), primary_key=True),
+    Column('team_size', Integer, nullable=False, default=0),
+    # Наибольшая команда (задача 6) - последний элемент индекса
+    Index('ix_job_stats_team_size', 'team_size')
+)
+
+department_stats = Table('department_stats', SqlAlchemyBase.metadata,
+    Column('department_id', Integer, ForeignKey('departments.id', ondelete='CASCADE'), primary_key=True),
+    Column('members', Integer, nullable=False, default=0),
+    Column('work_size', Integer, nullable=False, default=0),
+    Column('finished_work_size', Integer, nullable=False, default=0)
+)
+
+category_stats = Table('category_stats', SqlAlchemyBase.metadata,
+    Column('category_id', Integer, ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True),
+    Column('jobs', Integer, nullable=False, default=0),
+    Column('finished_jobs', Integer, nullable=False, default=0),
+    Column('work_size', Integer, nullable=False, default=0),
+    Column('finished_work_size', Integer, nullable=False, default=0)
 )
 
 class User(SqlAlchemyBase, UserMixin):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Фильтры по модулю и возрасту (задачи 1, 2, 7) и по возрасту (задача 3)
+        Index('ix_users_address_age', 'address', 'age'),
+        Index('ix_users_age', 'age'),
+        Index('ix_users_position', 'position'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     surname = Column(String, nullable=False)
@@ -23,32 +93,45 @@ class User(SqlAlchemyBase, UserMixin):
     address = Column(String)
     email = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    modified_date = Column(DateTime, default=datetime.utcnow)
+    # Назначаемая роль (captain); NULL - обычный колонист, см. data/permissions.py
+    role = Column(String)
+    modified_date = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Связи (используем строковые имена для избежания циклических импортов)
     jobs = relationship("Jobs", back_populates="team_leader_user")
     departments = relationship("Department", back_populates="chief_user")
     
-    def set_password(self, password):
-        self.hashed_password = generate_password_hash(password)
+    def set_password(self, password, profile=None):
+        self.hashed_password = hash_password(password, profile)
     
     def check_password(self, password):
         return check_password_hash(self.hashed_password, password)
     
+    def password_needs_rehash(self):
+        return needs_rehash(self.hashed_password)
+    
     def __repr__(self):
         return f"<Colonist> {self.id} {self.surname} {self.name}"
 
 class Jobs(SqlAlchemyBase):
     __tablename__ = 'jobs'
+    __table_args__ = (
+        # Незавершенные короткие работы (задача 5) и фильтры ленты
+        Index('ix_jobs_is_finished_work_size', 'is_finished', 'work_size'),
+        # Покрывающий индекс для часов по тимлидам (задача 8) и фильтра по тимлиду
+        Index('ix_jobs_team_leader_finished_size', 'team_leader', 'is_finished', 'work_size'),
+        Index('ix_jobs_work_size', 'work_size'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     team_leader = Column(Integer, ForeignKey('users.id'), nullable=False)
     job = Column(String, nullable=False)
     work_size = Column(Integer, nullable=False)
-    collaborators = Column(String)
+    collaborators = Column(String)  # текстовое представление для форм, источник данных - job_collaborators
     start_date = Column(DateTime, default=datetime.utcnow)
     end_date = Column(DateTime)
     is_finished = Column(Boolean, default=False)
+    modified_date = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Связи
     team_leader_user = relationship("User", back_populates="jobs")
@@ -57,21 +140,27 @@ class Jobs(SqlAlchemyBase):
         secondary=jobs_to_categories,
         back_populates="jobs"
     )
+    collaborator_users = relationship("User", secondary=job_collaborators)
     
     def __repr__(self):
         return f"<Job> {self.job}"
 
 class Department(SqlAlchemyBase):
     __tablename__ = 'departments'
+    __table_args__ = (
+        Index('ix_departments_chief', 'chief'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String, nullable=False)
     chief = Column(Integer, ForeignKey('users.id'), nullable=False)
-    members = Column(String)
+    members = Column(String)  # текстовое представление для форм, источник данных - department_members
     email = Column(String, unique=True, nullable=False)
+    modified_date = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Связи
     chief_user = relationship("User", back_populates="departments")
+    member_users = relationship("User", secondary=department_members)
 
 class Category(SqlAlchemyBase):
     __tablename__ = 'categories'
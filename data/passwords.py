@@ -0,0 +1,60 @@
+import os
+from werkzeug.security import generate_password_hash
+
+# Профили хеширования паролей: метод и стоимость в формате werkzeug
+PASSWORD_PROFILES = {
+    'production': 'scrypt:32768:8:1',   # значение werkzeug по умолчанию
+    'balanced': 'scrypt:16384:8:1',     # вдвое дешевле, для пиковых нагрузок на вход
+    'fast': 'pbkdf2:sha256:1000',       # только для тестов и заполнения базы
+}
+
+__method = None
+# Метод в том виде, в каком werkzeug пишет его в хеш ("scrypt" -> "scrypt:32768:8:1")
+__prefix = None
+
+
+def configure(profile=None, method=None):
+    """
+    Задает метод хеширования: явной строкой werkzeug (method) или именем
+    профиля. По умолчанию используются PASSWORD_HASH_METHOD и
+    PASSWORD_PROFILE из окружения.
+    """
+    global __method, __prefix
+    method = method or os.environ.get("PASSWORD_HASH_METHOD")
+    if not method:
+        profile = profile or os.environ.get("PASSWORD_PROFILE", "production")
+        if profile not in PASSWORD_PROFILES:
+            raise Exception(f"Неизвестный профиль хеширования паролей: {profile}")
+        method = PASSWORD_PROFILES[profile]
+    __method = method
+    __prefix = None
+
+
+def current_method():
+    global __method
+    if __method is None:
+        configure()
+    return __method
+
+
+def hash_password(password, profile=None):
+    """Хеширует пароль текущим методом или методом указанного профиля"""
+    method = PASSWORD_PROFILES[profile] if profile else current_method()
+    return generate_password_hash(password, method=method)
+
+
+def current_prefix():
+    """
+    Префикс хеша для текущего метода. Метод без параметров ("scrypt",
+    "pbkdf2:sha256") werkzeug дополняет значениями по умолчанию, поэтому
+    префикс берется из пробного хеша - один раз, при первой проверке
+    """
+    global __prefix
+    if __prefix is None:
+        __prefix = generate_password_hash('', method=current_method()).split('$', 1)[0]
+    return __prefix
+
+
+def needs_rehash(hashed_password):
+    """Хеш создан не текущим методом или стоимостью - его нужно пересчитать"""
+    return hashed_password.split('$', 1)[0] != current_prefix()
@@ -0,0 +1,130 @@
+import functools
+import os
+from flask import current_app, flash, g, jsonify, redirect
+from flask_login import current_user
+from sqlalchemy import exists, select, true, update
+from .cache import LRUCache
+from .models import User, Jobs, Department
+
+# Роли: капитан назначается колонкой users.role, начальник департамента и
+# тимлид определяются по данным (есть департамент/работа, где он chief/team_leader),
+# колонист - любой вошедший пользователь
+CAPTAIN = 'captain'
+DEPARTMENT_CHIEF = 'department_chief'
+TEAM_LEADER = 'team_leader'
+COLONIST = 'colonist'
+
+ROLE_PERMISSIONS = {
+    COLONIST: {'jobs.create', 'departments.create'},
+    TEAM_LEADER: {'jobs.bulk'},
+    DEPARTMENT_CHIEF: set(),
+    CAPTAIN: {'jobs.bulk', 'jobs.edit_any', 'departments.edit_any', 'categories.manage', 'data.import',
+              'debug.view', 'users.read'},
+}
+# Роли, определяемые по данным, кэшируются на PERMISSION_CACHE_TTL секунд:
+# от них зависят только элементы интерфейса, права на конкретные работы и
+# департаменты проверяются по самим строкам
+PERMISSION_CACHE_SIZE = int(os.environ.get("PERMISSION_CACHE_SIZE", 10000))
+PERMISSION_CACHE_TTL = float(os.environ.get("PERMISSION_CACHE_TTL", 30))
+
+derived_roles_cache = LRUCache(maxsize=PERMISSION_CACHE_SIZE, ttl=PERMISSION_CACHE_TTL)
+
+
+def derived_roles(db_sess, user_id):
+    """Роли по данным одним SELECT с двумя EXISTS по индексам chief и team_leader"""
+    roles = derived_roles_cache.get(user_id)
+    if roles is None:
+        is_chief, is_leader = db_sess.execute(select(
+            exists().where(Department.chief == user_id),
+            exists().where(Jobs.team_leader == user_id),
+        )).one()
+        roles = frozenset(role for role, present in ((DEPARTMENT_CHIEF, is_chief), (TEAM_LEADER, is_leader))
+                          if present)
+        derived_roles_cache.set(user_id, roles)
+    return roles
+
+
+class Permissions:
+    """Права одного пользователя; создаются один раз на HTTP-запрос (current_permissions)"""
+
+    def __init__(self, user_id, roles=(), db_sess=None):
+        self.user_id = user_id
+        # Роли, известные без запроса к базе: колонист и роль из users.role
+        self.declared = frozenset(role for role in roles if role in ROLE_PERMISSIONS)
+        self._db_sess = db_sess
+        self._roles = None
+
+    @property
+    def roles(self):
+        if self._roles is None:
+            derived = derived_roles(self._db_sess, self.user_id) if self._db_sess is not None else frozenset()
+            self._roles = frozenset(self.declared | derived)
+        return self._roles
+
+    def has(self, permission):
+        # Сначала роли из users.role - без запроса к базе
+        if any(permission in ROLE_PERMISSIONS[role] for role in self.declared):
+            return True
+        return any(permission in ROLE_PERMISSIONS[role] for role in self.roles)
+
+    def can_edit_job(self, job):
+        return self.has('jobs.edit_any') or job.team_leader == self.user_id
+
+    def editable_job_ids(self, jobs):
+        """Работы из уже загруженного списка, которые можно изменять, - без запросов"""
+        if self.has('jobs.edit_any'):
+            return {job.id for job in jobs}
+        return {job.id for job in jobs if job.team_leader == self.user_id}
+
+    def job_filter(self):
+        """То же правило в виде условия WHERE для массовых запросов"""
+        return true() if self.has('jobs.edit_any') else Jobs.team_leader == self.user_id
+
+    def can_edit_department(self, department):
+        return self.has('departments.edit_any') or department.chief == self.user_id
+
+    def editable_department_ids(self, departments):
+        if self.has('departments.edit_any'):
+            return {department.id for department in departments}
+        return {department.id for department in departments if department.chief == self.user_id}
+
+
+ANONYMOUS = Permissions(None)
+
+
+def current_permissions():
+    """Права текущего пользователя, вычисляемые один раз за запрос"""
+    permissions = g.get('permissions')
+    if permissions is None:
+        if not current_user.is_authenticated:
+            return ANONYMOUS
+        from . import db_session
+        permissions = Permissions(current_user.id, (COLONIST, current_user.role), db_session.get_session())
+        g.permissions = permissions
+    return permissions
+
+
+def permission_required(permission, message='Недостаточно прав', redirect_to='/', as_json=False):
+    """Декоратор представления (ставится после login_required)"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_permissions().has(permission):
+                if as_json:
+                    return jsonify({'error': message}), 403
+                flash(message, 'danger')
+                return redirect(redirect_to)
+            return current_app.ensure_sync(view)(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def assign_default_captain(connection):
+    """
+    Разовая миграция (schema_migrations): в базе без назначенного капитана
+    капитаном становится пользователь с ID 1, как было до ролей. Повторно
+    не выполняется, поэтому снятая роль последнего капитана не возвращается
+    """
+    if connection.execute(select(exists().where(User.role == CAPTAIN))).scalar():
+        return
+    connection.execute(update(User.__table__).where(User.id == 1).values(role=CAPTAIN))
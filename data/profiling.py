@@ -0,0 +1,207 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from flask import before_render_template, template_rendered, request
+
+# Профилирование включается явно: PERF_PROFILING=1
+PROFILING_ENABLED = os.environ.get("PERF_PROFILING", "0") == "1"
+# Сколько самых медленных запросов к базе показывать для одного HTTP-запроса
+SLOW_STATEMENTS = int(os.environ.get("PERF_SLOW_STATEMENTS", 5))
+# Один и тот же SQL, выполненный столько раз с разными параметрами, - признак N+1
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("PERF_N_PLUS_ONE", 5))
+# Сколько последних HTTP-запросов хранить для /debug/perf
+PERF_HISTORY = int(os.environ.get("PERF_HISTORY", 200))
+
+logger = logging.getLogger("mars.perf")
+
+_current = contextvars.ContextVar("request_profile", default=None)
+_history = deque(maxlen=PERF_HISTORY)
+_history_lock = threading.Lock()
+
+
+def parameter_shape(parameters, executemany=False):
+    """Форма параметров без значений: типы по позициям/именам, для executemany - число строк"""
+    if executemany:
+        rows = list(parameters or [])
+        return f"{len(rows)} x {parameter_shape(rows[0])}" if rows else "[]"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+class RequestProfile:
+    """Статистика одного HTTP-запроса: SQL, время базы и шаблонов"""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.status = None
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = []
+        self.templates = []
+        self._template_starts = []
+        # SQL -> (число выполнений, различные наборы параметров)
+        self._repeats = {}
+
+    def add_statement(self, statement, parameters, executemany, duration):
+        self.db_time += duration
+        self.statements.append((statement, parameter_shape(parameters, executemany), duration))
+        count, distinct = self._repeats.get(statement, (0, set()))
+        if len(distinct) < N_PLUS_ONE_THRESHOLD:
+            distinct.add(repr(parameters))
+        self._repeats[statement] = (count + 1, distinct)
+
+    def template_started(self, name):
+        self._template_starts.append((name, time.perf_counter()))
+
+    def template_finished(self):
+        if not self._template_starts:
+            return
+        name, started = self._template_starts.pop()
+        duration = time.perf_counter() - started
+        self.templates.append((name, duration))
+        # Вложенные рендеры уже входят во время внешнего шаблона
+        if not self._template_starts:
+            self.template_time += duration
+
+    def n_plus_one(self):
+        """SQL, повторенные не меньше N_PLUS_ONE_THRESHOLD раз с разными параметрами"""
+        return [
+            (statement, count) for statement, (count, distinct) in self._repeats.items()
+            if count >= N_PLUS_ONE_THRESHOLD and len(distinct) > 1
+        ]
+
+    def slowest(self, limit=SLOW_STATEMENTS):
+        return sorted(self.statements, key=lambda item: item[2], reverse=True)[:limit]
+
+    def finish(self, status):
+        self.status = status
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def headers(self):
+        return {
+            'X-SQL-Count': str(len(self.statements)),
+            'X-SQL-Time': f"{self.db_time * 1000:.2f}",
+            'X-Template-Time': f"{self.template_time * 1000:.2f}",
+            'X-N-Plus-One': str(len(self.n_plus_one())),
+            'Server-Timing': (f'db;dur={self.db_time * 1000:.2f};desc="SQL x{len(self.statements)}", '
+                              f'tpl;dur={self.template_time * 1000:.2f}, '
+                              f'total;dur={self.elapsed * 1000:.2f}'),
+        }
+
+    def to_dict(self):
+        return {
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'time_ms': round(self.elapsed * 1000, 2),
+            'sql_count': len(self.statements),
+            'sql_time_ms': round(self.db_time * 1000, 2),
+            'template_time_ms': round(self.template_time * 1000, 2),
+            'templates': [{'name': name, 'time_ms': round(duration * 1000, 2)}
+                          for name, duration in self.templates],
+            'slowest': [{'statement': statement, 'parameters': shape, 'time_ms': round(duration * 1000, 3)}
+                        for statement, shape, duration in self.slowest()],
+            'n_plus_one': [{'statement': statement, 'count': count} for statement, count in self.n_plus_one()],
+        }
+
+
+def history():
+    """Последние профили HTTP-запросов, новые первыми"""
+    with _history_lock:
+        return list(reversed(_history))
+
+
+def install(engine):
+    """Подключает замер каждого SQL-запроса к движку"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('perf_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['perf_started'].pop()
+        profile = _current.get()
+        if profile is not None:
+            profile.add_statement(statement, parameters, executemany, time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('perf_started'):
+            connection.info['perf_started'].pop()
+
+
+def on_template_start(sender, template, context, **extra):
+    profile = _current.get()
+    if profile is not None:
+        profile.template_started(template.name)
+
+
+def on_template_rendered(sender, template, context, **extra):
+    profile = _current.get()
+    if profile is not None:
+        profile.template_finished()
+
+
+def start_request():
+    _current.set(RequestProfile(request.method, request.full_path.rstrip('?')))
+
+
+def finish_request(response):
+    profile = _current.get()
+    if profile is None:
+        return response
+    _current.set(None)
+    profile.finish(response.status_code)
+    response.headers.update(profile.headers())
+    summary = profile.to_dict()
+    with _history_lock:
+        _history.append(summary)
+    logger.info(json.dumps(summary, ensure_ascii=False))
+    return response
+
+
+def slowest_statements(limit=20):
+    """Самые медленные SQL среди сохраненных запросов"""
+    statements = [
+        dict(statement, path=summary['path'])
+        for summary in history() for statement in summary['slowest']
+    ]
+    return sorted(statements, key=lambda item: item['time_ms'], reverse=True)[:limit]
+
+
+def n_plus_one_report():
+    """Обнаруженные N+1 по адресам: SQL -> наибольшее число повторов"""
+    report = {}
+    for summary in history():
+        for item in summary['n_plus_one']:
+            key = (summary['path'].split('?')[0], item['statement'])
+            report[key] = max(report.get(key, 0), item['count'])
+    return [{'path': path, 'statement': statement, 'count': count}
+            for (path, statement), count in sorted(report.items(), key=lambda entry: -entry[1])]
+
+
+def init_app(app):
+    """Подключает профилирование HTTP-запросов и рендеринга шаблонов к приложению"""
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    before_render_template.connect(on_template_start, app)
+    template_rendered.connect(on_template_rendered, app)
@@ -0,0 +1,95 @@
+from sqlalchemy import exists, insert, inspect, select, text
+from .db_session import SqlAlchemyBase
+
+
+def add_missing_columns(engine):
+    """
+    Добавляет в существующие таблицы колонки, объявленные в моделях позже
+    (например, modified_date). Поддерживаются только колонки, допускающие NULL.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in SqlAlchemyBase.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+
+def create_missing_indexes(engine):
+    """
+    Создает индексы, объявленные в моделях, которых еще нет в базе.
+    metadata.create_all не трогает уже существующие таблицы, поэтому
+    индексы, добавленные позже, создаются здесь отдельно.
+    """
+    with engine.begin() as connection:
+        # Перед созданием уникального ключа убираем дубли связей работа-категория
+        connection.execute(text(
+            "DELETE FROM jobs_to_categories WHERE rowid NOT IN ("
+            "SELECT MIN(rowid) FROM jobs_to_categories GROUP BY job_id, category_id)"
+        ))
+        for table in SqlAlchemyBase.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+
+# Полнотекстовые индексы FTS5 с триграммным токенизатором: ищут подстроку
+# без учета регистра (в том числе кириллицы) и поддерживаются триггерами
+SEARCH_INDEX_DDL = {
+    'users_fts': [
+        "CREATE VIRTUAL TABLE users_fts USING fts5("
+        "position, speciality, content='users', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER users_fts_ai AFTER INSERT ON users BEGIN "
+        "INSERT INTO users_fts(rowid, position, speciality) VALUES (new.id, new.position, new.speciality); END",
+        "CREATE TRIGGER users_fts_ad AFTER DELETE ON users BEGIN "
+        "INSERT INTO users_fts(users_fts, rowid, position, speciality) "
+        "VALUES ('delete', old.id, old.position, old.speciality); END",
+        "CREATE TRIGGER users_fts_au AFTER UPDATE OF position, speciality ON users BEGIN "
+        "INSERT INTO users_fts(users_fts, rowid, position, speciality) "
+        "VALUES ('delete', old.id, old.position, old.speciality); "
+        "INSERT INTO users_fts(rowid, position, speciality) VALUES (new.id, new.position, new.speciality); END",
+        "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",
+    ],
+    'departments_fts': [
+        "CREATE VIRTUAL TABLE departments_fts USING fts5("
+        "title, content='departments', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER departments_fts_ai AFTER INSERT ON departments BEGIN "
+        "INSERT INTO departments_fts(rowid, title) VALUES (new.id, new.title); END",
+        "CREATE TRIGGER departments_fts_ad AFTER DELETE ON departments BEGIN "
+        "INSERT INTO departments_fts(departments_fts, rowid, title) VALUES ('delete', old.id, old.title); END",
+        "CREATE TRIGGER departments_fts_au AFTER UPDATE OF title ON departments BEGIN "
+        "INSERT INTO departments_fts(departments_fts, rowid, title) VALUES ('delete', old.id, old.title); "
+        "INSERT INTO departments_fts(rowid, title) VALUES (new.id, new.title); END",
+        "INSERT INTO departments_fts(departments_fts) VALUES ('rebuild')",
+    ],
+}
+
+
+def create_search_index(engine):
+    """Создает поисковые таблицы FTS5 и триггеры, если их еще нет, и заполняет их"""
+    with engine.begin() as connection:
+        existing = {name for name, in connection.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        ))}
+        for name, statements in SEARCH_INDEX_DDL.items():
+            if name in existing:
+                continue
+            for statement in statements:
+                connection.execute(text(statement))
+
+
+def run_once(engine, name, migration):
+    """
+    Разовый шаг миграции: migration(connection) выполняется, только если
+    его имени еще нет в schema_migrations, и отмечается в той же транзакции.
+    Возвращает True, если шаг выполнен сейчас.
+    """
+    from .models import schema_migrations
+    with engine.begin() as connection:
+        if connection.execute(select(exists().where(schema_migrations.c.name == name))).scalar():
+            return False
+        migration(connection)
+        connection.execute(insert(schema_migrations).values(name=name))
+    return True
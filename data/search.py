@@ -0,0 +1,54 @@
+import sqlalchemy as sa
+from sqlalchemy import or_
+from .models import User, Department
+
+# Колонки, по которым ищутся колонисты
+USER_SEARCH_COLUMNS = ('position', 'speciality')
+
+# Триграммный индекс не работает для строк короче трех символов
+MIN_INDEXED_LENGTH = 3
+
+users_fts = sa.table('users_fts', sa.column('rowid'))
+departments_fts = sa.table('departments_fts', sa.column('rowid'))
+
+
+def fts_query(terms, columns):
+    """Строит выражение MATCH: любая из подстрок в любой из колонок"""
+    phrases = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+    return "{" + " ".join(columns) + "}: (" + phrases + ")"
+
+
+def fts_condition(model, fts_table, terms, columns):
+    terms = [term.strip() for term in terms if term and term.strip()]
+    if not terms:
+        return sa.false()
+    if any(len(term) < MIN_INDEXED_LENGTH for term in terms):
+        # Короткие подстроки ищем обычным LIKE; casefold() регистрируется
+        # в db_session, lower() в SQLite не меняет регистр кириллицы
+        return or_(*[
+            sa.func.casefold(getattr(model, column)).like(f"%{term.casefold()}%")
+            for term in terms for column in columns
+        ])
+    matching_ids = sa.select(fts_table.c.rowid).where(
+        sa.literal_column(fts_table.name).op('MATCH')(fts_query(terms, columns))
+    )
+    return model.id.in_(matching_ids)
+
+
+def users_matching(*terms, columns=USER_SEARCH_COLUMNS):
+    """Условие для User: в одной из колонок встречается любая из подстрок (без учета регистра)"""
+    return fts_condition(User, users_fts, terms, columns)
+
+
+def departments_matching(*terms):
+    """Условие для Department: в названии встречается любая из подстрок (без учета регистра)"""
+    return fts_condition(Department, departments_fts, terms, ('title',))
+
+
+def search(db_sess, query, limit=50):
+    """Поиск колонистов по должности/профессии и департаментов по названию"""
+    users = db_sess.query(User).filter(users_matching(query)).order_by(User.id).limit(limit).all()
+    departments = db_sess.query(Department).filter(
+        departments_matching(query)
+    ).order_by(Department.id).limit(limit).all()
+    return users, departments
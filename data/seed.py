@@ -0,0 +1,269 @@
+import os
+import random
+from datetime import datetime
+from sqlalchemy import func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from .models import User, Jobs, Department, Category, jobs_to_categories, job_collaborators, department_members
+from .passwords import hash_password
+from .stats import rebuild as rebuild_stats
+from .versions import bump
+
+# Размер пачки вставки: каждая пачка - один executemany и отдельная транзакция
+SEED_CHUNK_SIZE = int(os.environ.get("SEED_CHUNK_SIZE", 50000))
+# Начальные пароли хешируются дешевым профилем и пересчитываются при первом входе
+SEED_PASSWORD_PROFILE = "fast"
+
+ADDRESSES = ["module_1", "module_2", "module_3", "module_4"]
+POSITIONS = ["engineer", "chief engineer", "middle engineer", "geologist", "biologist", "technician", "captain"]
+SPECIALITIES = ["robotics", "mineralogy", "life support", "ecology", "energy systems", "research engineer"]
+SURNAMES = ["Ivanov", "Petrov", "Sidorov", "Kuznetsov", "Smirnov", "Watson", "Lee", "Gonzalez", "Nguyen", "Kovacs"]
+NAMES = ["Petr", "Alexey", "Nikolay", "Dmitry", "Mikhail", "Emma", "Anna", "Carlos", "Linh", "Ilya"]
+JOB_TITLES = ["deployment of residential modules", "maintenance of life support", "soil sampling",
+              "solar panel cleaning", "greenhouse planting", "rover repair", "ice drilling"]
+DEPARTMENT_TITLES = ["Geological Exploration", "Life Support Systems", "Energy", "Agriculture",
+                     "Medicine", "Logistics", "Robotics", "Research"]
+
+CATEGORIES = [
+    ("Construction", "Строительные работы"),
+    ("Research", "Научные исследования"),
+    ("Maintenance", "Техническое обслуживание"),
+    ("Exploration", "Исследование территории"),
+    ("Mining", "Добыча ресурсов"),
+    ("Agriculture", "Сельское хозяйство"),
+    ("Medicine", "Медицина"),
+    ("Logistics", "Логистика"),
+]
+
+# Начальные данные приложения: капитан (ID 1) и пять колонистов
+INITIAL_USERS = [
+    dict(surname="Scott", name="Ridley", age=21, position="captain", speciality="research engineer",
+         address="module_1", email="scott_chief@mars.org", password="captain123", role="captain"),
+    dict(surname="Ivanov", name="Petr", age=25, position="engineer", speciality="robotics",
+         address="module_1", email="ivanov@marss.org", password="colonist123"),
+    dict(surname="Petrov", name="Alexey", age=28, position="geologist", speciality="mineralogy",
+         address="module_2", email="petrov@marss.org", password="colonist123"),
+    dict(surname="Sidorov", name="Nikolay", age=32, position="chief engineer", speciality="life support",
+         address="module_1", email="sidorov@marss.org", password="colonist123"),
+    dict(surname="Kuznetsov", name="Dmitry", age=22, position="biologist", speciality="ecology",
+         address="module_3", email="kuznetsov@marss.org", password="colonist123"),
+    dict(surname="Smirnov", name="Mikhail", age=27, position="middle engineer", speciality="energy systems",
+         address="module_1", email="smirnov@marss.org", password="colonist123"),
+]
+INITIAL_DEPARTMENTS = [
+    dict(title="Geological Exploration", chief=1, members=[1, 2, 3], email="geology@marss.org"),
+    dict(title="Life Support Systems", chief=3, members=[3, 4, 5], email="life-support@marss.org"),
+]
+INITIAL_JOBS = [
+    dict(team_leader=1, job="deployment of residential modules 1 and 2", work_size=15,
+         collaborators=[2, 3], categories=["Construction"], is_finished=False),
+]
+SYNTHETIC_PASSWORD = "colonist123"
+
+
+def password_hashes(plain_passwords, profile=SEED_PASSWORD_PROFILE):
+    """Хеширует каждый различный пароль один раз"""
+    return {password: hash_password(password, profile) for password in set(plain_passwords)}
+
+
+def has_data(db_sess):
+    """Есть ли в базе хотя бы один пользователь (SELECT ... LIMIT 1 вместо count())"""
+    return db_sess.query(User.id).first() is not None
+
+
+def ensure_categories(db_sess, categories=CATEGORIES):
+    """Добавляет недостающие категории (INSERT OR IGNORE по имени), возвращает {имя: ID}"""
+    db_sess.execute(
+        sqlite_insert(Category.__table__).on_conflict_do_nothing(index_elements=[Category.name]),
+        [{'name': name, 'description': description} for name, description in categories]
+    )
+    return {name: category_id for category_id, name in db_sess.query(Category.id, Category.name)}
+
+
+def seed_initial_data(db_sess):
+    """
+    Создает начальные данные приложения одной транзакцией. Повторный запуск
+    ничего не делает: если пользователи уже есть, возвращает False.
+    """
+    if has_data(db_sess):
+        return False
+
+    hashes = password_hashes(user['password'] for user in INITIAL_USERS)
+    db_sess.execute(insert(User.__table__), [
+        {'role': None, **{key: value for key, value in user.items() if key != 'password'},
+         'id': user_id, 'hashed_password': hashes[user['password']]}
+        for user_id, user in enumerate(INITIAL_USERS, 1)
+    ])
+    category_ids = ensure_categories(db_sess, CATEGORIES[:4])
+
+    for dept_id, dept in enumerate(INITIAL_DEPARTMENTS, 1):
+        db_sess.execute(insert(Department.__table__), [{
+            'id': dept_id, 'title': dept['title'], 'chief': dept['chief'],
+            'members': ", ".join(map(str, dept['members'])), 'email': dept['email'],
+        }])
+        db_sess.execute(insert(department_members),
+                        [{'department_id': dept_id, 'user_id': user_id} for user_id in dept['members']])
+
+    for job_id, job in enumerate(INITIAL_JOBS, 1):
+        db_sess.execute(insert(Jobs.__table__), [{
+            'id': job_id, 'team_leader': job['team_leader'], 'job': job['job'],
+            'work_size': job['work_size'], 'collaborators': ", ".join(map(str, job['collaborators'])),
+            'start_date': datetime.now(), 'is_finished': job['is_finished'],
+        }])
+        db_sess.execute(insert(job_collaborators),
+                        [{'job_id': job_id, 'user_id': user_id} for user_id in job['collaborators']])
+        db_sess.execute(insert(jobs_to_categories),
+                        [{'job_id': job_id, 'category_id': category_ids[name]} for name in job['categories']])
+
+    rebuild_stats(db_sess.connection())
+    bump(db_sess, 'users', 'jobs', 'departments', 'categories')
+    db_sess.commit()
+    return True
+
+
+def chunk_ranges(first, last, size):
+    """
+    Делит диапазон ID [first, last] на пачки, выровненные по границам,
+    кратным size: одна и та же пачка всегда получает одинаковые данные
+    независимо от того, с какого ID продолжается заполнение.
+    Возвращает тройки (начало пачки, первый ID, последний ID).
+    """
+    chunk_start = (first - 1) // size * size + 1
+    while chunk_start <= last:
+        yield chunk_start, max(first, chunk_start), min(chunk_start + size - 1, last)
+        chunk_start += size
+
+
+def chunk_random(seed, table, chunk_start):
+    return random.Random(f"{seed}:{table}:{chunk_start}")
+
+
+USER_COLUMNS = ('id', 'surname', 'name', 'age', 'position', 'speciality', 'address',
+                'email', 'hashed_password', 'modified_date')
+JOB_COLUMNS = ('id', 'team_leader', 'job', 'work_size', 'collaborators', 'is_finished',
+               'start_date', 'modified_date')
+
+
+def bulk_insert(db_sess, table, columns, rows):
+    """
+    Вставляет кортежи одним executemany драйвера: на миллионах строк
+    построение параметров SQLAlchemy для каждой строки обходится дороже
+    самой вставки
+    """
+    statement = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    db_sess.connection().exec_driver_sql(statement, rows)
+
+
+def timestamp():
+    # Формат, в котором SQLAlchemy хранит DateTime в SQLite
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def synthetic_users(seed, chunk_start, first, last, hashed_password):
+    rnd = chunk_random(seed, 'users', chunk_start)
+    now = timestamp()
+    rows = []
+    for user_id in range(chunk_start, last + 1):
+        row = (user_id, rnd.choice(SURNAMES), rnd.choice(NAMES), rnd.randint(14, 70),
+               rnd.choice(POSITIONS), rnd.choice(SPECIALITIES), rnd.choice(ADDRESSES),
+               f"colonist{user_id}@mars.org", hashed_password, now)
+        if user_id >= first:
+            rows.append(row)
+    return rows
+
+
+def synthetic_jobs(seed, chunk_start, first, last, users_total, category_ids):
+    """Возвращает строки работ, участников и категорий для одной пачки"""
+    rnd = chunk_random(seed, 'jobs', chunk_start)
+    now = timestamp()
+    user_ids = range(1, users_total + 1)
+    jobs, collaborators, categories = [], [], []
+    for job_id in range(chunk_start, last + 1):
+        team = rnd.sample(user_ids, min(rnd.randint(0, 4), users_total))
+        job_categories = rnd.sample(category_ids, min(rnd.randint(0, 2), len(category_ids)))
+        row = (job_id, rnd.randint(1, users_total), f"{rnd.choice(JOB_TITLES)} #{job_id}",
+               rnd.randint(1, 50), ", ".join(map(str, team)), rnd.random() < 0.5, now, now)
+        if job_id < first:
+            continue
+        jobs.append(row)
+        collaborators.extend((job_id, user_id) for user_id in team)
+        categories.extend((job_id, category_id) for category_id in job_categories)
+    return jobs, collaborators, categories
+
+
+def max_id(db_sess, model):
+    return db_sess.query(func.coalesce(func.max(model.id), 0)).scalar()
+
+
+def generate_colony(db_sess, users=0, jobs=0, departments=0, seed=42,
+                    chunk_size=SEED_CHUNK_SIZE, members_per_department=50, progress=None):
+    """
+    Дополняет базу синтетическими колонистами, работами и департаментами
+    до users/jobs/departments строк (по наибольшему ID). Данные зависят
+    только от seed и размеров, поэтому повторный запуск с теми же
+    параметрами ничего не добавляет, а прерванное заполнение можно
+    продолжить. Строки вставляются пачками executemany драйвера,
+    пароль хешируется один раз для всех колонистов.
+    Возвращает число добавленных строк по таблицам.
+    """
+    added = {'users': 0, 'jobs': 0, 'departments': 0}
+    category_ids = sorted(ensure_categories(db_sess).values())
+    bump(db_sess, 'categories')
+    db_sess.commit()
+
+    first_user = max_id(db_sess, User) + 1
+    if first_user <= users:
+        hashed_password = password_hashes([SYNTHETIC_PASSWORD])[SYNTHETIC_PASSWORD]
+        for chunk_start, first, last in chunk_ranges(first_user, users, chunk_size):
+            bulk_insert(db_sess, User.__table__, USER_COLUMNS,
+                        synthetic_users(seed, chunk_start, first, last, hashed_password))
+            bump(db_sess, 'users')
+            db_sess.commit()
+            added['users'] += last - first + 1
+            if progress:
+                progress('users', last, users)
+
+    users_total = max_id(db_sess, User)
+    first_job = max_id(db_sess, Jobs) + 1
+    if first_job <= jobs and users_total:
+        for chunk_start, first, last in chunk_ranges(first_job, jobs, chunk_size):
+            job_rows, collaborators, categories = synthetic_jobs(
+                seed, chunk_start, first, last, users_total, category_ids)
+            bulk_insert(db_sess, Jobs.__table__, JOB_COLUMNS, job_rows)
+            if collaborators:
+                bulk_insert(db_sess, job_collaborators, ('job_id', 'user_id'), collaborators)
+            if categories:
+                bulk_insert(db_sess, jobs_to_categories, ('job_id', 'category_id'), categories)
+            bump(db_sess, 'jobs')
+            db_sess.commit()
+            added['jobs'] += last - first + 1
+            if progress:
+                progress('jobs', last, jobs)
+
+    first_dept = max_id(db_sess, Department) + 1
+    if first_dept <= departments and users_total:
+        for dept_id in range(first_dept, departments + 1):
+            rnd = chunk_random(seed, 'departments', dept_id)
+            members = rnd.sample(range(1, users_total + 1), min(members_per_department, users_total))
+            title = DEPARTMENT_TITLES[(dept_id - 1) % len(DEPARTMENT_TITLES)]
+            if dept_id > len(DEPARTMENT_TITLES):
+                title = f"{title} {dept_id}"
+            db_sess.execute(insert(Department.__table__), [{
+                'id': dept_id,
+                'title': title,
+                'chief': members[0],
+                'members': ", ".join(map(str, members)),
+                'email': f"dept{dept_id}@mars.org",
+            }])
+            db_sess.execute(insert(department_members),
+                            [{'department_id': dept_id, 'user_id': user_id} for user_id in members])
+            added['departments'] += 1
+        bump(db_sess, 'departments')
+        db_sess.commit()
+        if progress:
+            progress('departments', departments, departments)
+
+    # Статистика пересчитывается один раз после всех пачек
+    if any(added.values()):
+        rebuild_stats(db_sess.connection())
+        db_sess.commit()
+    return added
@@ -0,0 +1,386 @@
+from collections import Counter, defaultdict, namedtuple
+from sqlalchemy import bindparam, case, delete, event, func, insert, inspect, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from .models import (User, Jobs, Department, Category, jobs_to_categories, job_collaborators,
+                     department_members, user_stats, job_stats, department_stats, category_stats)
+
+# Агрегаты поддерживаются разностями: для каждой измененной работы берется
+# ее состояние до и после записи, вклад старого вычитается, нового -
+# прибавляется (UPDATE ... SET jobs = jobs + :d). Стоимость записи зависит
+# только от числа измененных работ, а не от размера категорий и департаментов.
+# Изменения через ORM собираются событиями сессии; запросы в обход ORM
+# (массовые операции, импорт) вызывают apply_job_changes()/create_rows() сами.
+# Полный пересчет - только rebuild() (заполнение, миграции, colony_stats.py)
+KINDS = ('users', 'jobs', 'departments', 'categories')
+# Атрибуты работы, от которых зависит статистика
+TRACKED_JOB_ATTRS = ('team_leader', 'work_size', 'is_finished', 'categories', 'collaborator_users')
+# Ограничение числа параметров в одном IN (...)
+ID_BATCH_SIZE = 500
+
+# Все, от чего зависит вклад работы в статистику
+JobState = namedtuple('JobState', 'team_leader work_size is_finished collaborators categories')
+
+
+def finished_sum(value):
+    return func.sum(case((Jobs.is_finished == True, value), else_=0))
+
+
+def user_rows(ids=None):
+    """Статистика колонистов: работы, где он тимлид, и участие в чужих работах"""
+    led = select(
+        Jobs.team_leader.label('user_id'),
+        func.count().label('jobs_led'),
+        finished_sum(1).label('finished_jobs_led'),
+        func.sum(Jobs.work_size).label('work_size'),
+        finished_sum(Jobs.work_size).label('finished_work_size'),
+    ).group_by(Jobs.team_leader)
+    collaborations = select(
+        job_collaborators.c.user_id, func.count().label('collaborations')
+    ).group_by(job_collaborators.c.user_id)
+    statement = select(User.id)
+    if ids is not None:
+        led = led.where(Jobs.team_leader.in_(ids))
+        collaborations = collaborations.where(job_collaborators.c.user_id.in_(ids))
+        statement = statement.where(User.id.in_(ids))
+    led, collaborations = led.subquery(), collaborations.subquery()
+    return statement.add_columns(
+        func.coalesce(led.c.jobs_led, 0),
+        func.coalesce(led.c.finished_jobs_led, 0),
+        func.coalesce(led.c.work_size, 0),
+        func.coalesce(led.c.finished_work_size, 0),
+        func.coalesce(collaborations.c.collaborations, 0),
+    ).outerjoin(led, led.c.user_id == User.id).outerjoin(collaborations, collaborations.c.user_id == User.id)
+
+
+def job_rows(ids=None):
+    """Размер команды каждой работы"""
+    teams = select(job_collaborators.c.job_id, func.count().label('team_size')).group_by(job_collaborators.c.job_id)
+    statement = select(Jobs.id)
+    if ids is not None:
+        teams = teams.where(job_collaborators.c.job_id.in_(ids))
+        statement = statement.where(Jobs.id.in_(ids))
+    teams = teams.subquery()
+    return statement.add_columns(func.coalesce(teams.c.team_size, 0)).outerjoin(teams, teams.c.job_id == Jobs.id)
+
+
+def department_rows(ids=None):
+    """Департаменты: число членов и объем работ, которыми они руководят"""
+    members = select(
+        department_members.c.department_id, func.count().label('members')
+    ).group_by(department_members.c.department_id)
+    work = select(
+        department_members.c.department_id,
+        func.sum(Jobs.work_size).label('work_size'),
+        finished_sum(Jobs.work_size).label('finished_work_size'),
+    ).join(Jobs, Jobs.team_leader == department_members.c.user_id).group_by(department_members.c.department_id)
+    statement = select(Department.id)
+    if ids is not None:
+        members = members.where(department_members.c.department_id.in_(ids))
+        work = work.where(department_members.c.department_id.in_(ids))
+        statement = statement.where(Department.id.in_(ids))
+    members, work = members.subquery(), work.subquery()
+    return statement.add_columns(
+        func.coalesce(members.c.members, 0),
+        func.coalesce(work.c.work_size, 0),
+        func.coalesce(work.c.finished_work_size, 0),
+    ).outerjoin(members, members.c.department_id == Department.id).outerjoin(
+        work, work.c.department_id == Department.id)
+
+
+def category_rows(ids=None):
+    """Категории: число работ и объем, всего и завершенных"""
+    jobs = select(
+        jobs_to_categories.c.category_id,
+        func.count().label('jobs'),
+        finished_sum(1).label('finished_jobs'),
+        func.sum(Jobs.work_size).label('work_size'),
+        finished_sum(Jobs.work_size).label('finished_work_size'),
+    ).join(Jobs, Jobs.id == jobs_to_categories.c.job_id).group_by(jobs_to_categories.c.category_id)
+    statement = select(Category.id)
+    if ids is not None:
+        jobs = jobs.where(jobs_to_categories.c.category_id.in_(ids))
+        statement = statement.where(Category.id.in_(ids))
+    jobs = jobs.subquery()
+    return statement.add_columns(
+        func.coalesce(jobs.c.jobs, 0),
+        func.coalesce(jobs.c.finished_jobs, 0),
+        func.coalesce(jobs.c.work_size, 0),
+        func.coalesce(jobs.c.finished_work_size, 0),
+    ).outerjoin(jobs, jobs.c.category_id == Category.id)
+
+
+# Вид статистики -> (таблица, ее ключ, построитель строк)
+STATS = {
+    'users': (user_stats, user_stats.c.user_id, user_rows),
+    'jobs': (job_stats, job_stats.c.job_id, job_rows),
+    'departments': (department_stats, department_stats.c.department_id, department_rows),
+    'categories': (category_stats, category_stats.c.category_id, category_rows),
+}
+
+
+def batches(ids):
+    ids = sorted(ids)
+    for start in range(0, len(ids), ID_BATCH_SIZE):
+        yield ids[start:start + ID_BATCH_SIZE]
+
+
+def job_states(connection, job_ids):
+    """Состояния работ из базы {ID: JobState}; отсутствующих работ в ответе нет"""
+    states = {}
+    for ids in batches(job_ids):
+        collaborators, categories = defaultdict(set), defaultdict(set)
+        for job_id, user_id in connection.execute(
+                select(job_collaborators.c.job_id, job_collaborators.c.user_id).where(
+                    job_collaborators.c.job_id.in_(ids))):
+            collaborators[job_id].add(user_id)
+        for job_id, category_id in connection.execute(
+                select(jobs_to_categories.c.job_id, jobs_to_categories.c.category_id).where(
+                    jobs_to_categories.c.job_id.in_(ids))):
+            categories[job_id].add(category_id)
+        for job_id, team_leader, work_size, is_finished in connection.execute(
+                select(Jobs.id, Jobs.team_leader, Jobs.work_size, Jobs.is_finished).where(Jobs.id.in_(ids))):
+            states[job_id] = JobState(team_leader, work_size or 0, bool(is_finished),
+                                      frozenset(collaborators[job_id]), frozenset(categories[job_id]))
+    return states
+
+
+def member_sets(connection, department_ids):
+    """Составы департаментов {ID: множество колонистов}"""
+    members = {department_id: set() for department_id in department_ids}
+    for ids in batches(department_ids):
+        for department_id, user_id in connection.execute(
+                select(department_members.c.department_id, department_members.c.user_id).where(
+                    department_members.c.department_id.in_(ids))):
+            members[department_id].add(user_id)
+    return {department_id: frozenset(users) for department_id, users in members.items()}
+
+
+def add_job(deltas, job_id, state, sign):
+    """Вклад одной работы в статистику со знаком +1 (новое состояние) или -1 (прежнее)"""
+    finished = 1 if state.is_finished else 0
+    leader = deltas['users'][state.team_leader]
+    leader['jobs_led'] += sign
+    leader['finished_jobs_led'] += sign * finished
+    leader['work_size'] += sign * state.work_size
+    leader['finished_work_size'] += sign * finished * state.work_size
+    for user_id in state.collaborators:
+        deltas['users'][user_id]['collaborations'] += sign
+    deltas['jobs'][job_id]['team_size'] += sign * len(state.collaborators)
+    for category_id in state.categories:
+        category = deltas['categories'][category_id]
+        category['jobs'] += sign
+        category['finished_jobs'] += sign * finished
+        category['work_size'] += sign * state.work_size
+        category['finished_work_size'] += sign * finished * state.work_size
+
+
+def add_members(connection, deltas, old_members, new_members):
+    """
+    Пришедшие и ушедшие члены департаментов: число членов и их объем работ.
+    Объем читается из user_stats до применения разностей работ, а разности
+    работ переносятся на департаменты уже по новому составу (add_leader_work)
+    """
+    changes = []
+    for department_id in set(old_members) | set(new_members):
+        old = old_members.get(department_id, frozenset())
+        new = new_members.get(department_id, frozenset())
+        changes.extend((department_id, user_id, 1) for user_id in new - old)
+        changes.extend((department_id, user_id, -1) for user_id in old - new)
+    work = {}
+    for ids in batches({user_id for _, user_id, _ in changes}):
+        work.update((user_id, (work_size, finished_work_size)) for user_id, work_size, finished_work_size in
+                    connection.execute(select(user_stats.c.user_id, user_stats.c.work_size,
+                                              user_stats.c.finished_work_size).where(user_stats.c.user_id.in_(ids))))
+    for department_id, user_id, sign in changes:
+        work_size, finished_work_size = work.get(user_id, (0, 0))
+        department = deltas['departments'][department_id]
+        department['members'] += sign
+        department['work_size'] += sign * work_size
+        department['finished_work_size'] += sign * finished_work_size
+
+
+def add_leader_work(connection, deltas):
+    """Объем работ департамента - сумма по его членам: разность тимлида идет во все его департаменты"""
+    leaders = {user_id: values for user_id, values in deltas['users'].items()
+               if values['work_size'] or values['finished_work_size']}
+    for ids in batches(leaders):
+        for department_id, user_id in connection.execute(
+                select(department_members.c.department_id, department_members.c.user_id).where(
+                    department_members.c.user_id.in_(ids))):
+            department = deltas['departments'][department_id]
+            department['work_size'] += leaders[user_id]['work_size']
+            department['finished_work_size'] += leaders[user_id]['finished_work_size']
+
+
+def apply_deltas(connection, deltas):
+    """Один executemany UPDATE ... SET x = x + :dx на таблицу; нулевые разности пропускаются"""
+    for kind, changes in deltas.items():
+        table, key, _ = STATS[kind]
+        columns = [column for column in table.columns if column is not key]
+        params = [dict({'b_key': row_key}, **{f'b_{column.name}': values[column.name] for column in columns})
+                  for row_key, values in sorted(changes.items()) if any(values.values())]
+        if params:
+            connection.execute(update(table).where(key == bindparam('b_key')).values(
+                {column.name: column + bindparam(f'b_{column.name}') for column in columns}
+            ), params)
+
+
+def create_rows(connection, users=(), jobs=(), departments=(), categories=()):
+    """Нулевые строки статистики для новых записей (INSERT ... ON CONFLICT DO NOTHING)"""
+    for kind, ids in (('users', users), ('jobs', jobs), ('departments', departments), ('categories', categories)):
+        table, key, _ = STATS[kind]
+        ids = set(ids) - {None}
+        if ids:
+            connection.execute(sqlite_insert(table).on_conflict_do_nothing(),
+                               [{key.name: row_id} for row_id in sorted(ids)])
+
+
+def delete_rows(connection, users=(), jobs=(), departments=(), categories=()):
+    for kind, ids in (('users', users), ('jobs', jobs), ('departments', departments), ('categories', categories)):
+        table, key, _ = STATS[kind]
+        for batch in batches(set(ids) - {None}):
+            connection.execute(delete(table).where(key.in_(batch)))
+
+
+def apply_changes(connection, old_jobs=None, new_jobs=None, old_members=None, new_members=None,
+                  created=None, deleted=None):
+    """
+    Применяет изменения разностями (в текущей транзакции):
+    old_jobs/new_jobs - состояния работ до и после записи ({ID: JobState},
+    работы нет в словаре - ее не было или она удалена), old_members/new_members -
+    составы департаментов, created/deleted - {вид: ID} новых и удаленных
+    колонистов, департаментов и категорий.
+    """
+    old_jobs, new_jobs = old_jobs or {}, new_jobs or {}
+    created = {kind: set(ids) for kind, ids in (created or {}).items()}
+    deleted = {kind: set(ids) for kind, ids in (deleted or {}).items()}
+    created.setdefault('jobs', set()).update(set(new_jobs) - set(old_jobs))
+    deleted.setdefault('jobs', set()).update(set(old_jobs) - set(new_jobs))
+    create_rows(connection, **created)
+
+    deltas = {kind: defaultdict(Counter) for kind in KINDS}
+    add_members(connection, deltas, old_members or {}, new_members or {})
+    for job_id, state in old_jobs.items():
+        add_job(deltas, job_id, state, -1)
+    for job_id, state in new_jobs.items():
+        add_job(deltas, job_id, state, 1)
+    add_leader_work(connection, deltas)
+
+    for kind, ids in deleted.items():
+        for row_key in ids:
+            deltas[kind].pop(row_key, None)
+    delete_rows(connection, **deleted)
+    apply_deltas(connection, deltas)
+
+
+def apply_job_changes(connection, old, new):
+    """Работы, измененные в обход ORM: состояния до и после из job_states()"""
+    apply_changes(connection, old_jobs=old, new_jobs=new)
+
+def rebuild(connection):
+    """Полный пересчет всех таблиц статистики"""
+    for table, _, rows in STATS.values():
+        connection.execute(delete(table))
+        connection.execute(insert(table).from_select([column.name for column in table.columns], rows()))
+
+
+def check(connection, limit=20):
+    """
+    Сравнивает сохраненную статистику с пересчитанной заново.
+    Возвращает {вид: список расходящихся ключей}; пустой словарь - все сходится.
+    """
+    problems = {}
+    for kind, (table, key, rows) in STATS.items():
+        expected = rows().subquery()
+        stored = select(*table.columns)
+        # Строки, которые есть только с одной стороны (EXCEPT в обе стороны)
+        missing = select(*expected.c).except_(stored)
+        extra = stored.except_(select(*expected.c))
+        keys = set()
+        for statement in (missing, extra):
+            keys.update(connection.execute(select(statement.subquery().c[0]).limit(limit)).scalars())
+        if keys:
+            problems[kind] = sorted(keys)[:limit]
+    return problems
+
+
+def ensure_stats(engine):
+    """Заполняет статистику, если таблицы только что созданы в базе с данными"""
+    with engine.begin() as connection:
+        has_users = connection.execute(select(User.id).limit(1)).first() is not None
+        has_stats = connection.execute(select(user_stats.c.user_id).limit(1)).first() is not None
+        if has_users and not has_stats:
+            rebuild(connection)
+
+
+def dashboard(db_sess, limit=10):
+    """Данные страницы /stats: готовые агрегаты, без пересчета по работам"""
+    totals = db_sess.execute(select(
+        func.coalesce(func.sum(user_stats.c.jobs_led), 0).label('jobs'),
+        func.coalesce(func.sum(user_stats.c.finished_jobs_led), 0).label('finished_jobs'),
+        func.coalesce(func.sum(user_stats.c.work_size), 0).label('work_size'),
+        func.coalesce(func.sum(user_stats.c.finished_work_size), 0).label('finished_work_size'),
+    )).one()
+    leaders = db_sess.query(User, *user_stats.c).join(user_stats, user_stats.c.user_id == User.id).filter(
+        user_stats.c.finished_work_size > 0
+    ).order_by(user_stats.c.finished_work_size.desc()).limit(limit).all()
+    teams = db_sess.query(Jobs, job_stats.c.team_size).join(job_stats, job_stats.c.job_id == Jobs.id).filter(
+        job_stats.c.team_size > 0
+    ).order_by(job_stats.c.team_size.desc()).limit(limit).all()
+    departments = db_sess.query(Department, *department_stats.c).join(
+        department_stats, department_stats.c.department_id == Department.id
+    ).order_by(department_stats.c.work_size.desc()).all()
+    categories = db_sess.query(Category, *category_stats.c).join(
+        category_stats, category_stats.c.category_id == Category.id
+    ).order_by(category_stats.c.work_size.desc()).all()
+    return {'totals': totals, 'leaders': leaders, 'teams': teams,
+            'departments': departments, 'categories': categories}
+
+
+def job_changed(session, obj):
+    if obj not in session.dirty:
+        return True
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in TRACKED_JOB_ATTRS)
+
+
+def members_changed(session, obj):
+    return obj in session.dirty and inspect(obj).attrs.member_users.history.has_changes()
+
+
+@event.listens_for(Session, 'before_flush')
+def collect_old_states(session, flush_context, instances):
+    """Состояния измененных и удаляемых работ и составы департаментов - до записи"""
+    job_ids = {obj.id for obj in list(session.dirty) + list(session.deleted)
+               if isinstance(obj, Jobs) and obj.id is not None and job_changed(session, obj)}
+    department_ids = {obj.id for obj in session.dirty if isinstance(obj, Department) and members_changed(session, obj)}
+    if not job_ids and not department_ids:
+        session.info.pop('stats_old', None)
+        return
+    connection = session.connection()
+    session.info['stats_old'] = (job_states(connection, job_ids), member_sets(connection, department_ids))
+
+
+@event.listens_for(Session, 'after_flush')
+def update_stats(session, flush_context):
+    old_jobs, old_members = session.info.pop('stats_old', ({}, {}))
+    created = {kind: set() for kind in KINDS if kind != 'jobs'}
+    deleted = {kind: set() for kind in KINDS if kind != 'jobs'}
+    job_ids, department_ids = set(), set()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Jobs) and job_changed(session, obj):
+            job_ids.add(obj.id)
+        elif isinstance(obj, Department) and (obj in session.new or members_changed(session, obj)):
+            department_ids.add(obj.id)
+    for kind, model in (('users', User), ('departments', Department), ('categories', Category)):
+        created[kind] = {obj.id for obj in session.new if isinstance(obj, model)}
+        deleted[kind] = {obj.id for obj in session.deleted if isinstance(obj, model)}
+
+    if not (old_jobs or old_members or job_ids or department_ids or any(created.values()) or any(deleted.values())):
+        return
+    connection = session.connection()
+    # Новые состояния - уже после записи; удаленных работ в них нет
+    apply_changes(connection, old_jobs=old_jobs, new_jobs=job_states(connection, job_ids),
+                  old_members=old_members, new_members=member_sets(connection, department_ids),
+                  created=created, deleted=deleted)
@@ -0,0 +1,32 @@
+from sqlalchemy import exists, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+# Проверки уникальности выполняет сама база по уникальным индексам
+# (users.email, categories.name): вместо SELECT перед INSERT - один запрос
+# с обработкой конфликта, поэтому параллельные запросы не создают дублей
+# и не падают с IntegrityError
+
+
+def insert_unique(db_sess, model, values):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING id.
+    Возвращает ID новой строки или None, если уникальное значение уже занято.
+    """
+    statement = insert(model.__table__).values(**values).on_conflict_do_nothing().returning(model.id)
+    return db_sess.execute(statement).scalar()
+
+
+def update_unique(db_sess, model, row_id, values):
+    """
+    UPDATE OR IGNORE ... RETURNING id для одной строки.
+    Возвращает False, если новое значение нарушает уникальность (или строки нет).
+    """
+    statement = update(model.__table__).prefix_with('OR IGNORE').where(
+        model.__table__.c.id == row_id
+    ).values(**values).returning(model.__table__.c.id)
+    return db_sess.execute(statement).scalar() is not None
+
+
+def row_exists(db_sess, condition):
+    """SELECT EXISTS(...): база останавливается на первой подходящей строке"""
+    return db_sess.execute(select(exists().where(condition))).scalar()
@@ -0,0 +1,63 @@
+import os
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .cache import LRUCache
+from .models import User
+
+# Кэш пользователей для flask_login: ключ - ID, значение - отсоединенный снимок.
+# Кэш свой у каждого процесса, поэтому изменения из других воркеров
+# становятся видны не позже чем через USER_CACHE_TTL секунд
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 300))
+
+user_cache = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+class UserSnapshot(UserMixin):
+    """Легкая неизменяемая копия строки users без хеша пароля и связи с сессией"""
+
+    FIELDS = ('id', 'surname', 'name', 'age', 'position', 'speciality', 'address', 'email', 'role', 'modified_date')
+
+    def __init__(self, user):
+        for field in self.FIELDS:
+            object.__setattr__(self, field, getattr(user, field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("UserSnapshot нельзя изменять")
+
+    def __repr__(self):
+        return f"<Colonist> {self.id} {self.surname} {self.name}"
+
+
+def load_user_snapshot(db_sess, user_id):
+    """Возвращает снимок пользователя из кэша, при промахе читает строку из базы"""
+    user_id = int(user_id)
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        user = db_sess.get(User, user_id)
+        if user is None:
+            return None
+        snapshot = UserSnapshot(user)
+        user_cache.set(user_id, snapshot)
+    return snapshot
+
+
+def invalidate_user(user_id):
+    user_cache.delete(user_id)
+
+
+# Сброс кэша при изменении строки пользователя через ORM
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_changed_user(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+# Массовые UPDATE/DELETE (query.update) не вызывают событий маппера - сбрасываем весь кэш
+@event.listens_for(Session, 'do_orm_execute')
+def invalidate_on_bulk_change(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and \
+            orm_execute_state.bind_mapper is not None and orm_execute_state.bind_mapper.class_ is User:
+        user_cache.clear()
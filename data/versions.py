@@ -0,0 +1,30 @@
+from datetime import datetime
+from sqlalchemy.dialects.sqlite import insert
+from .models import change_counters
+
+
+def bump(db_sess, *names):
+    """Увеличивает счетчики изменений таблиц в текущей транзакции"""
+    now = datetime.utcnow()
+    for name in names:
+        statement = insert(change_counters).values(name=name, version=1, modified_date=now)
+        db_sess.execute(statement.on_conflict_do_update(
+            index_elements=[change_counters.c.name],
+            set_={'version': change_counters.c.version + 1, 'modified_date': now}
+        ))
+
+
+def table_versions(db_sess, names):
+    """
+    Возвращает версии таблиц (в порядке names) и время последнего изменения
+    одним запросом по первичному ключу
+    """
+    rows = {
+        name: (version, modified_date)
+        for name, version, modified_date in db_sess.query(
+            change_counters.c.name, change_counters.c.version, change_counters.c.modified_date
+        ).filter(change_counters.c.name.in_(names))
+    }
+    versions = tuple(rows.get(name, (0, None))[0] for name in names)
+    dates = [rows[name][1] for name in names if name in rows and rows[name][1]]
+    return versions, max(dates) if dates else None
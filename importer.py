@@ -0,0 +1,304 @@
+"""
+Массовый импорт колонистов и работ из CSV/JSONL
+Использование:
+    python importer.py users <файл.csv|файл.jsonl> [<имя_бд>]
+    python importer.py jobs <файл.csv|файл.jsonl> [<имя_бд>]
+
+Колонки пользователей: surname, name, age, position, speciality, address, email, password
+Колонки работ: team_leader, job, work_size, collaborators, is_finished, categories
+
+Строки читаются потоково и обрабатываются пачками: проверка теми же
+правилами, что и в формах forms/user.py и forms/job.py, хеширование
+паролей (из командной строки - параллельно в пуле процессов), вставка
+одним executemany и отдельная транзакция на каждую пачку.
+"""
+
+import sys
+import os
+import csv
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from flask import Flask
+from sqlalchemy import insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.datastructures import MultiDict
+from werkzeug.security import generate_password_hash
+from data import db_session, passwords, stats
+from data.categories import category_choices as cached_category_choices
+from data.membership import parse_ids
+from data.models import User, Jobs, jobs_to_categories, job_collaborators
+from data.versions import bump as bump_versions
+from forms.user import RegisterForm
+from forms.job import JobForm
+
+CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 1000))
+HASH_WORKERS = int(os.environ.get("IMPORT_HASH_WORKERS", os.cpu_count() or 1))
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'да')
+
+
+class ImportReport:
+    """Итог импорта: число вставленных строк, ошибки по строкам и скорость"""
+
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, line, messages):
+        self.errors.append({'line': line, 'errors': messages})
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        self.errors.sort(key=lambda error: error['line'])
+        return self
+
+    @property
+    def rows_per_sec(self):
+        total = self.imported + len(self.errors)
+        return total / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self):
+        return {
+            'imported': self.imported,
+            'failed': len(self.errors),
+            'errors': self.errors,
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_sec': round(self.rows_per_sec, 1),
+        }
+
+
+def read_rows(stream, file_format):
+    """Потоково читает строки файла: возвращает пары (номер строки, словарь)"""
+    if file_format == 'csv':
+        for line, row in enumerate(csv.DictReader(stream), 2):
+            yield line, row
+    elif file_format == 'jsonl':
+        for line, text in enumerate(stream, 1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except json.JSONDecodeError as error:
+                yield line, error
+                continue
+            yield line, row if isinstance(row, dict) else ValueError("Строка должна быть JSON-объектом")
+    else:
+        raise ValueError("Поддерживаются форматы csv и jsonl")
+
+
+def chunks(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def form_errors(form):
+    return [f"{field}: {message}" for field, messages in form.errors.items() for message in messages]
+
+
+def user_formdata(row):
+    data = {key: '' if value is None else str(value) for key, value in row.items()}
+    data.setdefault('password_again', data.get('password', ''))
+    return MultiDict(data)
+
+
+def job_formdata(row):
+    data = MultiDict()
+    for key, value in row.items():
+        if key == 'categories':
+            values = value if isinstance(value, list) else parse_ids(str(value or ''))
+            for category_id in values:
+                data.add('categories', str(category_id))
+        elif key == 'is_finished':
+            if str(value).strip().lower() in TRUE_VALUES or value is True:
+                data.add('is_finished', 'y')
+        elif value is not None:
+            data.add(key, str(value))
+    return data
+
+
+def hash_one(args):
+    password, method = args
+    return generate_password_hash(password, method=method)
+
+
+def hash_passwords(pool, plain_passwords):
+    """Хеширует пароли пачки параллельно в пуле процессов"""
+    method = passwords.current_method()
+    if pool is None:
+        return [hash_one((password, method)) for password in plain_passwords]
+    return list(pool.map(hash_one, [(password, method) for password in plain_passwords], chunksize=16))
+
+
+def import_users_chunk(db_sess, chunk, report, pool):
+    valid, emails = [], set()
+    for line, row in chunk:
+        if isinstance(row, Exception):
+            report.add_error(line, [str(row)])
+            continue
+        form = RegisterForm(formdata=user_formdata(row), meta={'csrf': False})
+        if not form.validate():
+            report.add_error(line, form_errors(form))
+            continue
+        if form.email.data in emails:
+            report.add_error(line, ["email: Повторяется в файле"])
+            continue
+        emails.add(form.email.data)
+        valid.append((line, form))
+
+    if not valid:
+        return
+
+    hashes = hash_passwords(pool, [form.password.data for _, form in valid])
+    # Уникальность email проверяет база (data/unique.py): занятые адреса
+    # пропускаются без IntegrityError, даже если регистрация пришла между пачками
+    inserted = dict(db_sess.execute(
+        sqlite_insert(User.__table__).on_conflict_do_nothing(index_elements=['email']).returning(User.email, User.id),
+        [
+            {
+                'surname': form.surname.data or '',
+                'name': form.name.data,
+                'age': form.age.data,
+                'position': form.position.data,
+                'speciality': form.speciality.data,
+                'address': form.address.data,
+                'email': form.email.data,
+                'hashed_password': hashed,
+            }
+            for (_, form), hashed in zip(valid, hashes)
+        ]
+    ).all())
+    for line, form in valid:
+        if form.email.data not in inserted:
+            report.add_error(line, ["email: Пользователь с таким email уже существует"])
+    if not inserted:
+        db_sess.rollback()
+        return
+    user_ids = list(inserted.values())
+    # Вставка идет в обход ORM, поэтому строки статистики создаются явно
+    stats.create_rows(db_sess.connection(), users=user_ids)
+    bump_versions(db_sess, 'users')
+    db_sess.commit()
+    report.imported += len(user_ids)
+
+
+def import_jobs_chunk(db_sess, chunk, report, category_choices):
+    valid = []
+    for line, row in chunk:
+        if isinstance(row, Exception):
+            report.add_error(line, [str(row)])
+            continue
+        form = JobForm(formdata=job_formdata(row), meta={'csrf': False})
+        form.categories.choices = category_choices
+        if not form.validate():
+            report.add_error(line, form_errors(form))
+            continue
+        valid.append((line, form.data))
+
+    # Руководители и участники проверяются одним запросом на пачку
+    referenced = {data['team_leader'] for _, data in valid}
+    for _, data in valid:
+        referenced.update(parse_ids(data['collaborators']))
+    known_users = {user_id for user_id, in db_sess.query(User.id).filter(User.id.in_(referenced))} \
+        if referenced else set()
+
+    rows = []
+    for line, data in valid:
+        if data['team_leader'] not in known_users:
+            report.add_error(line, [f"team_leader: Пользователь {data['team_leader']} не найден"])
+            continue
+        data['collaborator_ids'] = [user_id for user_id in parse_ids(data['collaborators']) if user_id in known_users]
+        rows.append(data)
+    if not rows:
+        return
+
+    job_ids = db_sess.execute(
+        insert(Jobs.__table__).returning(Jobs.id, sort_by_parameter_order=True),
+        [
+            {
+                'team_leader': data['team_leader'],
+                'job': data['job'],
+                'work_size': data['work_size'],
+                'collaborators': ", ".join(map(str, data['collaborator_ids'])),
+                'is_finished': data['is_finished'],
+            }
+            for data in rows
+        ]
+    ).scalars().all()
+
+    collaborators = [{'job_id': job_id, 'user_id': user_id}
+                     for job_id, data in zip(job_ids, rows) for user_id in data['collaborator_ids']]
+    categories = [{'job_id': job_id, 'category_id': category_id}
+                  for job_id, data in zip(job_ids, rows) for category_id in set(data['categories'] or [])]
+    if collaborators:
+        db_sess.execute(insert(job_collaborators), collaborators)
+    if categories:
+        db_sess.execute(insert(jobs_to_categories), categories)
+    stats.apply_job_changes(db_sess.connection(), {}, stats.job_states(db_sess.connection(), job_ids))
+    bump_versions(db_sess, 'jobs')
+    db_sess.commit()
+    report.imported += len(rows)
+
+
+def run_import(db_sess, kind, stream, file_format, pool=None):
+    """
+    Импортирует пользователей или работы из потока; возвращает ImportReport.
+    pool - пул процессов для хеширования паролей (только CLI); без него,
+    как при загрузке через веб, пароли хешируются в текущем процессе
+    """
+    report = ImportReport()
+    rows = read_rows(stream, file_format)
+    if kind == 'users':
+        for chunk in chunks(rows):
+            import_users_chunk(db_sess, chunk, report, pool)
+    elif kind == 'jobs':
+        category_choices = cached_category_choices(db_sess)
+        for chunk in chunks(rows):
+            import_jobs_chunk(db_sess, chunk, report, category_choices)
+    else:
+        raise ValueError("Можно импортировать только users или jobs")
+    return report.finish()
+
+
+def detect_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('users', 'jobs'):
+        print(__doc__)
+        sys.exit(1)
+
+    kind, filename = sys.argv[1], sys.argv[2]
+    db_file = sys.argv[3] if len(sys.argv) > 3 else "mars_explorer.db"
+    db_session.global_init(db_file)
+
+    # Формы Flask-WTF требуют контекста приложения
+    validation_app = Flask(__name__)
+    validation_app.config['WTF_CSRF_ENABLED'] = False
+    # Пул процессов для хеширования паролей создается один раз на запуск
+    pool = ProcessPoolExecutor(max_workers=HASH_WORKERS) if kind == 'users' and HASH_WORKERS > 1 else None
+    try:
+        with validation_app.app_context(), open(filename, encoding='utf-8', newline='') as stream:
+            session = db_session.create_session()
+            report = run_import(session, kind, stream, detect_format(filename), pool)
+            session.close()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    for error in report.errors:
+        print(f"Строка {error['line']}: {'; '.join(error['errors'])}")
+    print(f"\nИмпортировано: {report.imported}, с ошибками: {len(report.errors)}")
+    print(f"Время: {report.elapsed:.2f} с, скорость: {report.rows_per_sec:.0f} строк/с")
+
+
+if __name__ == "__main__":
+    main()
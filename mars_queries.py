@@ -16,11 +16,12 @@
 
 import sys
 import os
-from sqlalchemy import or_, func
+from datetime import datetime
+from sqlalchemy import func, select
 from data import db_session
-from data.users import User
-from data.jobs import Jobs
-from data.departments import Department
+from data.models import User, Jobs, Department, department_members, job_stats, user_stats
+from data.search import users_matching, departments_matching
+from data.versions import bump as bump_versions
 
 # Настройка путей для импорта модулей
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -45,10 +46,10 @@ def query_non_engineers_module1(session):
     """Выводит ID колонистов в module_1 без 'engineer' в speciality или position"""
     colonists = session.query(User).filter(
         User.address == "module_1",
-        ~or_(
-            User.speciality.ilike("%engineer%"),
-            User.position.ilike("%engineer%")
-        )
+        # Как и прежнее NOT (ilike OR ilike): колонисты без профессии или должности не выводятся
+        User.speciality.isnot(None),
+        User.position.isnot(None),
+        ~users_matching("engineer", columns=("speciality", "position"))
     ).all()
     
     if not colonists:
@@ -76,10 +77,7 @@ def query_minors(session):
 def query_chief_middle(session):
     """Выводит колонистов с 'chief' или 'middle' в должности"""
     colonists = session.query(User).filter(
-        or_(
-            User.position.ilike("%chief%"),
-            User.position.ilike("%middle%")
-        )
+        users_matching("chief", "middle", columns=("position",))
     ).all()
     
     if not colonists:
@@ -109,28 +107,22 @@ def query_short_jobs(session):
 # === ЗАДАЧА 6: Тимлиды работ с наибольшими командами ===
 def query_largest_teams(session):
     """Выводит тимлидов работ с наибольшими командами"""
-    all_jobs = session.query(Jobs).all()
-    
-    if not all_jobs:
+    # Размер команды хранится в job_stats (data/stats.py): максимум берется
+    # с конца индекса по team_size, работы и тимлиды - одним SELECT
+    max_team_size = select(func.max(job_stats.c.team_size)).scalar_subquery()
+    largest_jobs = session.query(Jobs, User, job_stats.c.team_size).join(
+        job_stats, job_stats.c.job_id == Jobs.id
+    ).outerjoin(
+        User, User.id == Jobs.team_leader
+    ).filter(job_stats.c.team_size == max_team_size).order_by(Jobs.id).all()
+
+    if not largest_jobs:
         print("Работ не найдено")
         return
 
-    jobs_with_team_size = []
-    for job in all_jobs:
-        team_size = 0
-        if job.collaborators:
-            collaborators_str = job.collaborators.strip('[] ')
-            if collaborators_str:
-                team_size = len([c.strip() for c in collaborators_str.split(',') if c.strip()])
-        jobs_with_team_size.append((job, team_size))
-
-    max_team_size = max(size for _, size in jobs_with_team_size)
-
-    largest_jobs = [job for job, size in jobs_with_team_size if size == max_team_size]
-    
+    max_team_size = largest_jobs[0][2]
     print(f"Работы с максимальным размером команды ({max_team_size} участников):")
-    for i, job in enumerate(largest_jobs, 1):
-        leader = session.query(User).filter(User.id == job.team_leader).first()
+    for i, (job, leader, _) in enumerate(largest_jobs, 1):
         leader_name = f"{leader.surname} {leader.name}" if leader else f"ID {job.team_leader} (не найден)"
         collaborators = job.collaborators or "не указаны"
         print(f"{i}. Работа: {job.job}")
@@ -158,23 +150,27 @@ def query_update_addresses(session):
         print("Изменение отменено")
         return
     
+    # Один UPDATE для всех найденных колонистов вместо изменения по одному объекту
+    updated = session.query(User).filter(
+        User.address == "module_1",
+        User.age < 21
+    ).update(
+        {User.address: "module_3", User.modified_date: datetime.utcnow()},
+        synchronize_session=False
+    )
+    # ETag страниц и кэш фрагментов зависят от счетчика users - в той же транзакции
+    bump_versions(session, 'users')
     for colonist in young_colonists:
-        old_address = colonist.address
-        colonist.address = "module_3"
-        print(f"Адрес изменен для {colonist}: {old_address} -> module_3")
-    
+        print(f"Адрес изменен для {colonist}: module_1 -> module_3")
     session.commit()
-    print(f"\n✅ Успешно изменен адрес для {len(young_colonists)} колонистов")
+    print(f"\n✅ Успешно изменен адрес для {updated} колонистов")
 
 # === ЗАДАЧА 8: Сотрудники геологического департамента с >25 часов работы ===
 def query_department_hours(session):
     """Выводит сотрудников геологического департамента с >25 часов работы"""
     # Ищем геологический департамент
     geo_dept = session.query(Department).filter(
-        or_(
-            Department.title.ilike("%geological%"),
-            Department.title.ilike("%геолог%")
-        )
+        departments_matching("geological", "геолог")
     ).first()
     
     if not geo_dept:
@@ -183,29 +179,23 @@ def query_department_hours(session):
     
     print(f"Найден департамент: {geo_dept.title} (ID: {geo_dept.id})")
 
-    member_ids = []
-    if geo_dept.members:
-        members_str = geo_dept.members.strip('[] ')
-        if members_str:
-            member_ids = [int(id_str.strip()) for id_str in members_str.split(',') if id_str.strip().isdigit()]
-    
-    if not member_ids:
+    # Члены департамента берутся из таблицы связей, их часы по завершенным
+    # работам - готовое значение из user_stats (data/stats.py)
+    members = session.query(User, func.coalesce(user_stats.c.finished_work_size, 0)).join(
+        department_members, department_members.c.user_id == User.id
+    ).outerjoin(
+        user_stats, user_stats.c.user_id == User.id
+    ).filter(
+        department_members.c.department_id == geo_dept.id
+    ).order_by(User.id).all()
+    
+    if not members:
         print("В департаменте нет участников")
         return
     
-    print(f"Участники департамента (ID): {', '.join(map(str, member_ids))}")
+    print(f"Участники департамента (ID): {', '.join(str(member.id) for member, _ in members)}")
     
-    qualified_members = []
-    for member_id in member_ids:
-        total_hours = session.query(func.sum(Jobs.work_size)).filter(
-            Jobs.team_leader == member_id,
-            Jobs.is_finished == True
-        ).scalar() or 0
-        
-        if total_hours > 25:
-            member = session.query(User).filter(User.id == member_id).first()
-            if member:
-                qualified_members.append((member, total_hours))
+    qualified_members = [(member, hours) for member, hours in members if hours > 25]
     
     if not qualified_members:
         print("Сотрудников с суммарным временем работы >25 часов не найдено")
@@ -215,17 +205,20 @@ def query_department_hours(session):
     for member, hours in qualified_members:
         print(f"{member.surname} {member.name} (ID: {member.id}) - {hours} часов")
 
+# Все задачи: номер -> (описание, функция)
+TASKS = {
+    '1': ('Все колонисты в модуле 1', query_module1_colonists),
+    '2': ('ID колонистов в module_1 без "engineer" в профессии/должности', query_non_engineers_module1),
+    '3': ('Несовершеннолетние колонисты', query_minors),
+    '4': ('Колонисты с "chief" или "middle" в должности', query_chief_middle),
+    '5': ('Работы <20 часов, не завершенные', query_short_jobs),
+    '6': ('Тимлиды работ с наибольшими командами', query_largest_teams),
+    '7': ('Изменить адрес для колонистов <21 года в module_1', query_update_addresses),
+    '8': ('Сотрудники геол. департамента с >25 часов работы', query_department_hours),
+}
+
 def main():
-    tasks = {
-        '1': ('Все колонисты в модуле 1', query_module1_colonists),
-        '2': ('ID колонистов в module_1 без "engineer" в профессии/должности', query_non_engineers_module1),
-        '3': ('Несовершеннолетние колонисты', query_minors),
-        '4': ('Колонисты с "chief" или "middle" в должности', query_chief_middle),
-        '5': ('Работы <20 часов, не завершенные', query_short_jobs),
-        '6': ('Тимлиды работ с наибольшими командами', query_largest_teams),
-        '7': ('Изменить адрес для колонистов <21 года в module_1', query_update_addresses),
-        '8': ('Сотрудники геол. департамента с >25 часов работы', query_department_hours),
-    }
+    tasks = TASKS
     
     if len(sys.argv) < 2:
         print(__doc__)
@@ -0,0 +1,25 @@
+"""
+Создание и обновление схемы базы данных
+Использование:
+    python migrate.py [<имя_бд>]
+
+Создает недостающие таблицы, колонки и индексы, поисковые индексы FTS5,
+заполняет материализованную статистику и назначает капитана. Запускается
+перед стартом приложения (при развертывании); сами воркеры схему не трогают.
+Повторный запуск на актуальной базе ничего не меняет.
+"""
+
+import sys
+import time
+from data import db_session
+
+
+def main(db_filename="mars_explorer.db"):
+    started = time.perf_counter()
+    db_session.global_init(db_filename, migrate=True)
+    print(f"Схема базы {db_filename} актуальна ({time.perf_counter() - started:.2f} с)")
+
+
+if __name__ == "__main__":
+    db = sys.argv[1] if len(sys.argv) > 1 else "mars_explorer.db"
+    main(db)
@@ -0,0 +1,25 @@
+"""
+Разовая миграция участников работ и членов департаментов в таблицы связей
+Использование:
+    python migrate_memberships.py [<имя_бд>]
+"""
+
+import sys
+from data import db_session
+from data.membership import migrate_memberships
+
+
+def main(db_filename="mars_explorer.db"):
+    db_session.global_init(db_filename, migrate=True)
+    session = db_session.create_session()
+
+    jobs_links, department_links = migrate_memberships(session)
+    session.close()
+
+    print(f"Перенесено связей работа-участник: {jobs_links}")
+    print(f"Перенесено связей департамент-член: {department_links}")
+
+
+if __name__ == "__main__":
+    db = sys.argv[1] if len(sys.argv) > 1 else "mars_explorer.db"
+    main(db)
@@ -0,0 +1,72 @@
+"""
+Число SQL-запросов ленты (GET /) не зависит от количества работ:
+тимлиды подтягиваются JOIN, категории - одним SELECT ... IN (data/feed.py)
+"""
+
+import os
+import sys
+import pytest
+from sqlalchemy import event
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# Первый замер - меньше страницы, второй - полная страница из MAX_PAGE_SIZE карточек
+JOBS = 10
+CAPTAIN = {'email': 'scott_chief@mars.org', 'password': 'captain123'}
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('feed')
+    cwd = os.getcwd()
+    os.chdir(directory)
+    from app import create_app
+    from data import db_session
+    from data.seed import seed_initial_data
+    application = create_app(str(directory / 'mars_explorer.db'), debug=True, migrate=True)
+    application.config['WTF_CSRF_ENABLED'] = False
+    session = db_session.create_session()
+    seed_initial_data(session)
+    session.close()
+    yield application
+    os.chdir(cwd)
+
+
+def feed_statements(client):
+    from data import db_session
+    from data.feed import MAX_PAGE_SIZE
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db_session.get_engine(), 'before_cursor_execute', listener)
+    try:
+        response = client.get(f'/?limit={MAX_PAGE_SIZE}')
+    finally:
+        event.remove(db_session.get_engine(), 'before_cursor_execute', listener)
+    assert response.status_code == 200
+    return len(statements), response.data.count(b'job-card')
+
+
+def grow_colony(jobs):
+    from data import db_session
+    from data.seed import generate_colony
+    session = db_session.create_session()
+    generate_colony(session, users=50, jobs=jobs, departments=3, seed=42)
+    session.close()
+
+
+def test_feed_statement_count_does_not_grow_with_jobs(app):
+    anonymous, captain = app.test_client(), app.test_client()
+    captain.post('/login', data=CAPTAIN)
+
+    counts = []
+    for jobs in (JOBS, JOBS * 10):
+        grow_colony(jobs)
+        captain.get('/')  # прогрев кэшей пользователя и прав
+        counts.append((feed_statements(anonymous), feed_statements(captain)))
+
+    (small_anonymous, small_cards), (small_captain, _) = counts[0]
+    (large_anonymous, large_cards), (large_captain, _) = counts[1]
+    assert small_cards < large_cards
+    assert small_anonymous == large_anonymous
+    assert small_captain == large_captain
@@ -0,0 +1,709 @@
+"""
+Представления приложения (блюпринт main). Модуль импортируется фабрикой
+create_app() из app.py; формы и импортер загружаются при первом обращении
+к представлению, которое их использует.
+"""
+
+import functools
+import hashlib
+import io
+from urllib.parse import urlparse
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, jsonify, \
+    session, make_response
+from flask_login import login_user, login_required, logout_user, current_user
+from markupsafe import Markup
+from sqlalchemy.orm import joinedload
+from data import db_session, passwords, profiling, metrics, stats
+from data.feed import jobs_page, parse_feed_filters, DEFAULT_PAGE_SIZE
+from data.membership import set_job_collaborators, set_department_members
+from data.categories import category_choices, job_category_ids, set_job_categories
+from data.permissions import current_permissions, permission_required
+from data.unique import insert_unique, update_unique, row_exists
+from data.bulk_jobs import apply_bulk, parse_job_ids, BulkError, BULK_ACTIONS, OK as BULK_OK
+from data.search import search as search_records
+from data.user_cache import user_cache
+from data.fragments import fragment_cache, job_key, department_key
+from data.versions import bump as bump_versions, table_versions
+from data.models import User, Jobs, Department, Category, jobs_to_categories
+
+main = Blueprint('main', __name__)
+
+
+# Права текущего пользователя доступны во всех шаблонах
+@main.app_context_processor
+def inject_permissions():
+    return {'permissions': current_permissions()}
+
+# Условный GET для страниц-списков: ETag строится из счетчиков изменений
+# таблиц, пользователя и адреса запроса. Если ETag совпал, ответ 304
+# отдается без тяжелых запросов и рендеринга шаблона
+def conditional_get(*tables):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Страницу с непоказанными флеш-сообщениями нужно отрендерить заново
+            # ensure_sync: декоратор подходит и для async-представлений
+            if request.method != 'GET' or session.get('_flashes'):
+                return current_app.ensure_sync(view)(*args, **kwargs)
+            versions, last_modified = table_versions(db_session.get_session(), tables)
+            user_id = current_user.get_id() if current_user.is_authenticated else None
+            etag = hashlib.sha1(repr((versions, user_id, request.full_path)).encode()).hexdigest()
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(current_app.ensure_sync(view)(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
+
+# Карточки работ и департаментов рендерятся через кэш фрагментов: версия
+# меняется при изменении строки, тимлида/начальника или списка категорий
+def render_job_card(job):
+    leader = job.team_leader_obj
+    version = (job.modified_date, leader.modified_date if leader else None, job.categories_list)
+    return Markup(fragment_cache.render(
+        job_key(job.id), version,
+        lambda: render_template('fragments/job_card.html', job=job)
+    ))
+
+def render_department_card(dep):
+    chief = dep.chief_obj
+    version = (dep.modified_date, chief.modified_date if chief else None)
+    return Markup(fragment_cache.render(
+        department_key(dep.id), version,
+        lambda: render_template('fragments/department_card.html', dep=dep)
+    ))
+
+# Главная страница
+@main.route("/")
+@conditional_get('jobs', 'users', 'categories')
+def index():
+    db_sess = db_session.get_session()
+    filters = parse_feed_filters(request.args)
+    # Keyset-пагинация: тимлиды подтягиваются через JOIN, категории - одним
+    # SELECT ... IN, поэтому число запросов не зависит от количества работ
+    jobs, next_cursor = jobs_page(
+        db_sess,
+        after=request.args.get('after', type=int),
+        limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+        **filters
+    )
+    
+    all_categories = db_sess.query(Category).order_by(Category.name).all()
+    return render_index(jobs, next_cursor, all_categories)
+
+def render_index(jobs, next_cursor, all_categories):
+    # Добавляем дополнительную информацию для каждой работы (без запросов к БД)
+    for job in jobs:
+        job.team_leader_obj = job.team_leader_user
+        job.categories_list = ", ".join([category.name for category in job.categories]) if job.categories else "Без категории"
+        job.card_html = render_job_card(job)
+    
+    # Параметры фильтра сохраняются в ссылке на следующую страницу
+    filter_args = {key: value for key, value in request.args.items() if key != 'after' and value}
+    # Права на все карточки страницы - одной проверкой по уже загруженным работам
+    editable_jobs = current_permissions().editable_job_ids(jobs)
+    return render_template("index.html", jobs=jobs, current_user=current_user,
+                           next_cursor=next_cursor, filter_args=filter_args,
+                           all_categories=all_categories, bulk_actions=BULK_ACTIONS,
+                           editable_jobs=editable_jobs)
+
+# Страница входа
+@main.route('/login', methods=['GET', 'POST'])
+@db_session.retry_on_lock
+def login():
+    from forms.auth import LoginForm
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    
+    form = LoginForm()
+    if form.validate_on_submit():
+        db_sess = db_session.get_session()
+        user = db_sess.query(User).filter(User.email == form.email.data).first()
+        if user and user.check_password(form.password.data):
+            # Хеш, созданный другим методом или стоимостью, прозрачно пересчитываем
+            if user.password_needs_rehash():
+                user.set_password(form.password.data)
+                db_sess.commit()
+            metrics.count_login(True)
+            login_user(user, remember=form.remember_me.data)
+            flash('Вы успешно вошли в систему!', 'success')
+            next_page = request.args.get('next')
+            if not next_page or urlparse(next_page).netloc != '':
+                next_page = url_for('main.index')
+            return redirect(next_page)
+        else:
+            metrics.count_login(False)
+            flash('Неправильный email или пароль', 'danger')
+    return render_template('login.html', form=form)
+
+# Выход из системы
+@main.route('/logout', methods=['GET', 'POST'])
+@login_required
+def logout():
+    logout_user()
+    flash('Вы успешно вышли из системы', 'info')
+    return redirect(url_for('main.index'))
+
+# Страница регистрации
+@main.route('/register', methods=['GET', 'POST'])
+@db_session.retry_on_lock
+def register():
+    from forms.user import RegisterForm
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    
+    form = RegisterForm()
+    if form.validate_on_submit():
+        db_sess = db_session.get_session()
+        # Уникальность email проверяет база: при конфликте строка не вставляется
+        user_id = insert_unique(db_sess, User, {
+            'surname': form.surname.data,
+            'name': form.name.data,
+            'age': form.age.data,
+            'position': form.position.data,
+            'speciality': form.speciality.data,
+            'address': form.address.data,
+            'email': form.email.data,
+            'hashed_password': passwords.hash_password(form.password.data),
+        })
+        if user_id is None:
+            db_sess.rollback()
+            flash('Пользователь с таким email уже существует', 'danger')
+            return render_template('register.html', form=form)
+        
+        stats.create_rows(db_sess.connection(), users=[user_id])
+        bump_versions(db_sess, 'users')
+        db_sess.commit()
+        
+        flash('Регистрация прошла успешно! Теперь вы можете войти в систему.', 'success')
+        return redirect('/login')
+    
+    return render_template('register.html', form=form, title='Регистрация')
+
+# Создание работы
+@main.route('/create_job', methods=['GET', 'POST'])
+@login_required
+@permission_required('jobs.create', 'У вас нет прав для создания работ')
+@db_session.retry_on_lock
+def create_job():
+    from forms.job import JobForm
+    form = JobForm()
+    db_sess = db_session.get_session()
+    form.categories.choices = category_choices(db_sess)
+    
+    if form.validate_on_submit():
+        job = Jobs(
+            team_leader=form.team_leader.data,
+            job=form.job.data,
+            work_size=form.work_size.data,
+            is_finished=form.is_finished.data
+        )
+        set_job_collaborators(db_sess, job, form.collaborators.data)
+        db_sess.add(job)
+        # ID работы нужен для связей с категориями
+        db_sess.flush()
+        set_job_categories(db_sess, job.id, form.categories.data)
+        
+        bump_versions(db_sess, 'jobs')
+        db_sess.commit()
+        
+        flash('Работа успешно добавлена!', 'success')
+        return redirect('/')
+    
+    return render_template('create_job.html', form=form, title='Создание работы')
+
+# Редактирование работы
+@main.route('/edit_job/<int:id>', methods=['GET', 'POST'])
+@login_required
+@db_session.retry_on_lock
+def edit_job(id):
+    from forms.job import JobForm
+    db_sess = db_session.get_session()
+    job = db_sess.query(Jobs).get(id)
+    
+    if not job:
+        flash('Работа не найдена', 'danger')
+        return redirect('/')
+    
+    # Проверка прав доступа: только тимлид работы или капитан
+    if not current_permissions().can_edit_job(job):
+        flash('У вас нет прав для редактирования этой работы', 'danger')
+        return redirect('/')
+    
+    form = JobForm()
+    form.categories.choices = category_choices(db_sess)
+    
+    if request.method == "GET":
+        form.team_leader.data = job.team_leader
+        form.job.data = job.job
+        form.work_size.data = job.work_size
+        form.collaborators.data = job.collaborators
+        form.is_finished.data = job.is_finished
+        form.categories.data = sorted(job_category_ids(db_sess, job.id))
+    
+    if form.validate_on_submit():
+        job.team_leader = form.team_leader.data
+        job.job = form.job.data
+        job.work_size = form.work_size.data
+        set_job_collaborators(db_sess, job, form.collaborators.data)
+        job.is_finished = form.is_finished.data
+        
+        # Категории: только разность с текущими связями, одним DELETE и одним INSERT
+        set_job_categories(db_sess, job.id, form.categories.data)
+        
+        bump_versions(db_sess, 'jobs')
+        db_sess.commit()
+        fragment_cache.invalidate(job_key(job.id))
+        flash('Работа успешно обновлена!', 'success')
+        return redirect('/')
+    
+    return render_template('create_job.html', form=form, title='Редактирование работы')
+
+# Удаление работы
+@main.route('/delete_job/<int:id>', methods=['POST'])
+@login_required
+@db_session.retry_on_lock
+def delete_job(id):
+    db_sess = db_session.get_session()
+    job = db_sess.query(Jobs).get(id)
+    
+    if not job:
+        flash('Работа не найдена', 'danger')
+        return redirect('/')
+    
+    # Проверка прав доступа: только тимлид работы или капитан
+    if not current_permissions().can_edit_job(job):
+        flash('У вас нет прав для удаления этой работы', 'danger')
+        return redirect('/')
+    
+    db_sess.delete(job)
+    bump_versions(db_sess, 'jobs')
+    db_sess.commit()
+    fragment_cache.invalidate(job_key(id))
+    flash('Работа успешно удалена!', 'success')
+    return redirect('/')
+
+def is_int(value):
+    # bool - подкласс int: true в JSON не должен превращаться в ID 1
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def is_int_list(value):
+    return isinstance(value, list) and all(is_int(item) for item in value)
+
+# Массовые операции над работами (форма ленты или JSON)
+@main.route('/jobs/bulk', methods=['POST'])
+@login_required
+@db_session.retry_on_lock
+def bulk_jobs():
+    data = request.get_json(silent=True) if request.is_json else None
+    if request.is_json:
+        # Тело должно быть объектом, ids и categories - списками целых чисел,
+        # team_leader - целым числом или null
+        if not isinstance(data, dict) or not is_int_list(data.get('ids')) or \
+                not is_int_list(data.get('categories') or []) or \
+                not (data.get('team_leader') is None or is_int(data.get('team_leader'))):
+            return jsonify({'error': 'Неверные параметры операции'}), 400
+        job_ids, action = data.get('ids'), data.get('action')
+        team_leader, category_ids = data.get('team_leader'), data.get('categories')
+    else:
+        job_ids, action = request.form.getlist('job_ids'), request.form.get('action')
+        team_leader = request.form.get('team_leader') or None
+        category_ids = request.form.getlist('categories')
+
+    db_sess = db_session.get_session()
+    try:
+        job_ids = parse_job_ids(job_ids)
+        team_leader = int(team_leader) if team_leader is not None else None
+        category_ids = [int(category_id) for category_id in category_ids or []]
+        results, changed = apply_bulk(db_sess, current_permissions(), job_ids, action,
+                                      team_leader=team_leader, category_ids=category_ids)
+    except (BulkError, TypeError, ValueError) as error:
+        db_sess.rollback()
+        message = str(error) if isinstance(error, BulkError) else 'Неверные параметры операции'
+        if data is not None:
+            return jsonify({'error': message}), 400
+        flash(message, 'danger')
+        return redirect(request.referrer or url_for('main.index'))
+
+    if changed:
+        bump_versions(db_sess, 'jobs')
+    db_sess.commit()
+    fragment_cache.invalidate(*[job_key(job_id) for job_id in changed])
+
+    if data is not None:
+        return jsonify({'action': action, 'changed': len(changed),
+                        'results': {str(job_id): outcome for job_id, outcome in results.items()}})
+    failed = [job_id for job_id, outcome in results.items() if outcome != BULK_OK]
+    flash(f'{BULK_ACTIONS[action]}: изменено работ - {len(changed)}', 'success' if changed else 'warning')
+    if failed:
+        flash(f'Не изменены (нет работы или нет прав): {", ".join(map(str, failed))}', 'warning')
+    return redirect(request.referrer or url_for('main.index'))
+
+# Просмотр департаментов
+@main.route('/departments')
+@login_required
+@conditional_get('departments', 'users')
+def departments():
+    db_sess = db_session.get_session()
+    # Начальники подтягиваются через JOIN, без запроса на каждый департамент
+    deps = db_sess.query(Department).options(joinedload(Department.chief_user)).all()
+    return render_departments(deps)
+
+def render_departments(deps):
+    # Добавляем информацию о начальнике для каждого департамента
+    for dep in deps:
+        dep.chief_obj = dep.chief_user
+        dep.card_html = render_department_card(dep)
+    
+    editable_departments = current_permissions().editable_department_ids(deps)
+    return render_template('department.html', departments=deps, current_user=current_user,
+                           editable_departments=editable_departments)
+
+# Статистика колонии из материализованных агрегатов (data/stats.py)
+@main.route('/stats')
+@login_required
+@conditional_get('jobs', 'users', 'departments', 'categories')
+def colony_stats():
+    data = stats.dashboard(db_session.get_session())
+    return render_template('stats.html', title='Статистика колонии', **data)
+
+# Создание департамента
+@main.route('/create_department', methods=['GET', 'POST'])
+@login_required
+@permission_required('departments.create', 'У вас нет прав для создания департаментов', redirect_to='/departments')
+@db_session.retry_on_lock
+def create_department():
+    from forms.department import DepartmentForm
+    form = DepartmentForm()
+    if form.validate_on_submit():
+        db_sess = db_session.get_session()
+        dept = Department(
+            title=form.title.data,
+            chief=form.chief.data,
+            email=form.email.data
+        )
+        set_department_members(db_sess, dept, form.members.data)
+        db_sess.add(dept)
+        bump_versions(db_sess, 'departments')
+        db_sess.commit()
+        
+        flash('Департамент успешно добавлен!', 'success')
+        return redirect('/departments')
+    
+    return render_template('create_department.html', form=form, title='Создание департамента')
+
+# Редактирование департамента
+@main.route('/edit_department/<int:id>', methods=['GET', 'POST'])
+@login_required
+@db_session.retry_on_lock
+def edit_department(id):
+    from forms.department import DepartmentForm
+    db_sess = db_session.get_session()
+    dept = db_sess.query(Department).get(id)
+    
+    if not dept:
+        flash('Департамент не найден', 'danger')
+        return redirect('/departments')
+    
+    # Проверка прав доступа: только начальник департамента или капитан
+    if not current_permissions().can_edit_department(dept):
+        flash('У вас нет прав для редактирования этого департамента', 'danger')
+        return redirect('/departments')
+    
+    form = DepartmentForm()
+    
+    if request.method == "GET":
+        form.title.data = dept.title
+        form.chief.data = dept.chief
+        form.members.data = dept.members
+        form.email.data = dept.email
+    
+    if form.validate_on_submit():
+        dept.title = form.title.data
+        dept.chief = form.chief.data
+        set_department_members(db_sess, dept, form.members.data)
+        dept.email = form.email.data
+        
+        bump_versions(db_sess, 'departments')
+        db_sess.commit()
+        fragment_cache.invalidate(department_key(dept.id))
+        flash('Департамент успешно обновлен!', 'success')
+        return redirect('/departments')
+    
+    return render_template('create_department.html', form=form, title='Редактирование департамента')
+
+# Удаление департамента
+@main.route('/delete_department/<int:id>', methods=['POST'])
+@login_required
+@db_session.retry_on_lock
+def delete_department(id):
+    db_sess = db_session.get_session()
+    dept = db_sess.query(Department).get(id)
+    
+    if not dept:
+        flash('Департамент не найден', 'danger')
+        return redirect('/departments')
+    
+    # Проверка прав доступа: только начальник департамента или капитан
+    if not current_permissions().can_edit_department(dept):
+        flash('У вас нет прав для удаления этого департамента', 'danger')
+        return redirect('/departments')
+    
+    db_sess.delete(dept)
+    bump_versions(db_sess, 'departments')
+    db_sess.commit()
+    fragment_cache.invalidate(department_key(id))
+    flash('Департамент успешно удален!', 'success')
+    return redirect('/departments')
+
+# Управление категориями
+@main.route('/categories')
+@login_required
+@permission_required('categories.manage', 'Только капитан может просматривать категории')
+@conditional_get('categories')
+def categories():
+    db_sess = db_session.get_session()
+    cats = db_sess.query(Category).all()
+    return render_template('categories.html', categories=cats, current_user=current_user)
+
+@main.route('/create_category', methods=['GET', 'POST'])
+@login_required
+@permission_required('categories.manage', 'Только капитан может создавать категории', redirect_to='/categories')
+@db_session.retry_on_lock
+def create_category():
+    from forms.category import CategoryForm
+    form = CategoryForm()
+    if form.validate_on_submit():
+        db_sess = db_session.get_session()
+        category_id = insert_unique(db_sess, Category, {
+            'name': form.name.data,
+            'description': form.description.data
+        })
+        if category_id is None:
+            db_sess.rollback()
+            flash('Категория с таким названием уже существует', 'danger')
+            return render_template('create_categories.html', form=form)
+        
+        stats.create_rows(db_sess.connection(), categories=[category_id])
+        bump_versions(db_sess, 'categories')
+        db_sess.commit()
+        
+        flash('Категория успешно добавлена!', 'success')
+        return redirect('/categories')
+    
+    return render_template('create_categories.html', form=form, title='Создание категории')
+
+@main.route('/edit_category/<int:id>', methods=['GET', 'POST'])
+@login_required
+@permission_required('categories.manage', 'Только капитан может редактировать категории', redirect_to='/categories')
+@db_session.retry_on_lock
+def edit_category(id):
+    from forms.category import CategoryForm
+    db_sess = db_session.get_session()
+    category = db_sess.query(Category).get(id)
+    
+    if not category:
+        flash('Категория не найдена', 'danger')
+        return redirect('/categories')
+    
+    form = CategoryForm()
+    
+    if request.method == "GET":
+        form.name.data = category.name
+        form.description.data = category.description
+    
+    if form.validate_on_submit():
+        # Занятое название отклоняет уникальный индекс (UPDATE OR IGNORE)
+        if not update_unique(db_sess, Category, category.id,
+                             {'name': form.name.data, 'description': form.description.data}):
+            db_sess.rollback()
+            flash('Категория с таким названием уже существует', 'danger')
+            return render_template('create_categories.html', form=form)
+        
+        bump_versions(db_sess, 'categories')
+        db_sess.commit()
+        # Название категории выводится в карточках работ
+        fragment_cache.invalidate(*[
+            job_key(job_id) for job_id, in db_sess.query(jobs_to_categories.c.job_id).filter(
+                jobs_to_categories.c.category_id == category.id
+            )
+        ])
+        
+        flash('Категория успешно обновлена!', 'success')
+        return redirect('/categories')
+    
+    return render_template('create_categories.html', form=form, title='Редактирование категории')
+
+@main.route('/delete_category/<int:id>', methods=['POST'])
+@login_required
+@permission_required('categories.manage', 'Только капитан может удалять категории', redirect_to='/categories')
+@db_session.retry_on_lock
+def delete_category(id):
+    db_sess = db_session.get_session()
+    category = db_sess.query(Category).get(id)
+    
+    if not category:
+        flash('Категория не найдена', 'danger')
+        return redirect('/categories')
+    
+    # Проверяем, есть ли работы, связанные с этой категорией
+    # EXISTS по индексу category_id вместо загрузки всех работ категории
+    if row_exists(db_sess, jobs_to_categories.c.category_id == category.id):
+        flash('Нельзя удалить категорию, так как с ней связаны работы. Сначала удалите связь с работами.', 'danger')
+        return redirect('/categories')
+    
+    
+    db_sess.delete(category)
+    bump_versions(db_sess, 'categories')
+    db_sess.commit()
+    
+    flash('Категория успешно удалена!', 'success')
+    return redirect('/categories')
+
+# Массовый импорт колонистов и работ из CSV/JSONL (только для капитана)
+@main.route('/import/<kind>', methods=['POST'])
+@login_required
+@permission_required('data.import', 'Только капитан может импортировать данные', as_json=True)
+def bulk_import(kind):
+    from importer import run_import, detect_format
+    if kind not in ('users', 'jobs'):
+        return jsonify({'error': 'Можно импортировать только users или jobs'}), 404
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'error': 'Файл не передан'}), 400
+
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8', newline='')
+    report = run_import(db_session.get_session(), kind, stream, detect_format(upload.filename or ''))
+    return jsonify(report.to_dict())
+
+# Поиск колонистов по должности/профессии и департаментов по названию
+@main.route('/search')
+@login_required
+def search():
+    query = request.args.get('q', '').strip()
+    users, deps = [], []
+    if query:
+        users, deps = search_records(db_session.get_session(), query)
+    return render_template('search.html', query=query, users=users, departments=deps,
+                           current_user=current_user)
+
+# Статистика кэшей (только для капитана)
+@main.route('/debug/cache')
+@login_required
+@permission_required('debug.view', 'Только капитан может просматривать метрики')
+def debug_cache():
+    return jsonify({
+        'fragments': fragment_cache.stats(),
+        'users': {'size': len(user_cache), 'hits': user_cache.hits, 'misses': user_cache.misses},
+    })
+
+# Метрики пула соединений (только для капитана)
+@main.route('/debug/pool')
+@login_required
+@permission_required('debug.view', 'Только капитан может просматривать метрики')
+def debug_pool():
+    return jsonify(db_session.pool_stats())
+
+# Профили последних запросов: SQL, N+1 и время шаблонов (только для капитана)
+@main.route('/debug/perf')
+@login_required
+@permission_required('debug.view', 'Только капитан может просматривать метрики')
+def debug_perf():
+    return render_template('perf.html', title='Профилирование', enabled=profiling.PROFILING_ENABLED,
+                           requests=profiling.history(), slowest=profiling.slowest_statements(),
+                           n_plus_one=profiling.n_plus_one_report())
+
+# Метрики в текстовом формате Prometheus
+@main.route('/metrics')
+def prometheus_metrics():
+    return current_app.response_class(metrics.render(db_session.get_session()),
+                              content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Асинхронный путь чтения (ASYNC_READS=1): ленту, департаменты, категории и
+# списки API читает асинхронный движок aiosqlite, запись остается
+# синхронной. Представления подменяются по имени эндпоинта, поэтому адреса,
+# url_for и декораторы доступа не меняются
+def preload_request_state(view):
+    """
+    Flask выполняет async-представление через asgiref в другом потоке, а
+    scoped-сессия привязана к потоку: сессия, открытая там загрузкой
+    пользователя или правами в шаблоне, не закрылась бы в teardown.
+    Пользователь и его роли загружаются заранее, в потоке запроса
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        current_user._get_current_object()
+        current_permissions().roles
+        return current_app.ensure_sync(view)(*args, **kwargs)
+    return wrapper
+
+def enable_async_reads(app, db_file):
+    from data import async_db
+    from api import DEFAULT_PAGE_SIZE as API_PAGE_SIZE, MAX_PAGE_SIZE as API_MAX_PAGE_SIZE, \
+        api_error, resource_error, resource_select, serialize
+    async_db.global_init(db_file)
+
+    @conditional_get('jobs', 'users', 'categories')
+    @preload_request_state
+    async def index_async():
+        async with async_db.create_session() as db_sess:
+            jobs, next_cursor = await async_db.jobs_page(
+                db_sess,
+                after=request.args.get('after', type=int),
+                limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+                **parse_feed_filters(request.args)
+            )
+            all_categories = await async_db.categories(db_sess, by_name=True)
+        return render_index(jobs, next_cursor, all_categories)
+
+    @login_required
+    @conditional_get('departments', 'users')
+    @preload_request_state
+    async def departments_async():
+        async with async_db.create_session() as db_sess:
+            deps = await async_db.departments(db_sess)
+        return render_departments(deps)
+
+    @login_required
+    @permission_required('categories.manage', 'Только капитан может просматривать категории')
+    @conditional_get('categories')
+    @preload_request_state
+    async def categories_async():
+        async with async_db.create_session() as db_sess:
+            cats = await async_db.categories(db_sess)
+        return render_template('categories.html', categories=cats, current_user=current_user)
+
+    @login_required
+    @preload_request_state
+    async def list_resource_async(resource):
+        error = resource_error(resource)
+        if error:
+            return error
+        try:
+            model, fields, statement = resource_select(resource)
+        except ValueError as error:
+            return api_error(str(error), 400)
+
+        limit = min(max(request.args.get('limit', API_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+        after = request.args.get('after', 0, type=int)
+        statement = statement.filter(model.id > after).order_by(model.id).limit(limit + 1)
+        async with async_db.create_session() as db_sess:
+            rows = (await db_sess.execute(statement)).all()
+        next_after = rows[limit - 1].id if len(rows) > limit else None
+        items = [{field: serialize(value) for field, value in zip(fields, row)} for row in rows[:limit]]
+        return jsonify({'items': items, 'next_after': next_after})
+
+    app.view_functions.update({
+        'main.index': index_async,
+        'main.departments': departments_async,
+        'main.categories': categories_async,
+        'api_v1.list_resource': list_resource_async,
+    })